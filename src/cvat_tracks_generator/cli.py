@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import click
 
@@ -9,6 +10,10 @@ from .cvat_xml import (
 )
 from .renderer import render_xml_on_video
 from .detector import detect_and_track_to_xml
+from .metrics import evaluate_tracks
+from .diff import diff_tracks, merge3_tracks
+from .segments import split_cvat_xml, concat_cvat_xml
+from .server import serve, is_loopback_host
 
 
 @click.group()
@@ -63,6 +68,138 @@ def edit_cmd(xml: str, out_xml: str, merge: str, delete_ids: str, video: str | N
         render_xml_on_video(tracks, video, save_video)
 
 
+@main.command("eval")
+@click.option("--gt", required=True, type=click.Path(exists=True, dir_okay=False), help="Ground-truth CVAT XML")
+@click.option("--pred", required=True, type=click.Path(exists=True, dir_okay=False), help="Predicted CVAT XML")
+@click.option("--iou-threshold", default=0.5, show_default=True, type=click.FloatRange(0.0, 1.0))
+@click.option("--per-track/--no-per-track", default=False, help="Print stats for every ground-truth track")
+def eval_cmd(gt: str, pred: str, iou_threshold: float, per_track: bool) -> None:
+    """Compare predicted tracks against ground truth and report MOTA, IDF1 and ID switches."""
+    result = evaluate_tracks(read_cvat_xml(gt), read_cvat_xml(pred), iou_threshold=iou_threshold)
+
+    click.echo(f"Frames:      {result.num_frames}")
+    click.echo(f"GT boxes:    {result.num_gt}")
+    click.echo(f"Pred boxes:  {result.num_pred}")
+    click.echo(f"TP/FP/FN:    {result.tp}/{result.fp}/{result.fn}")
+    click.echo(f"ID switches: {result.id_switches}")
+    click.echo(f"MOTA:        {result.mota:.4f}")
+    click.echo(f"MOTP (IoU):  {result.motp:.4f}")
+    click.echo(f"IDF1:        {result.idf1:.4f} (IDP {result.idp:.4f}, IDR {result.idr:.4f})")
+    click.echo(f"Precision:   {result.precision:.4f}")
+    click.echo(f"Recall:      {result.recall:.4f}")
+    click.echo(f"GT tracks:   {len(result.track_stats)} (mostly tracked {result.mostly_tracked}, mostly lost {result.mostly_lost})")
+
+    if per_track:
+        click.echo("")
+        click.echo("track  length  matched  coverage  switches  pred_ids")
+        for s in result.track_stats.values():
+            ids = ",".join(str(i) for i in s.pred_ids)
+            click.echo(f"{s.id:>5}  {s.length:>6}  {s.matched:>7}  {s.coverage:>8.2%}  {s.id_switches:>8}  {ids}")
+
+
+def _format_frames(frames: list[int], limit: int = 10) -> str:
+    shown = ",".join(str(f) for f in frames[:limit])
+    return shown + (f",... ({len(frames)} total)" if len(frames) > limit else "")
+
+
+@main.command("diff")
+@click.option("--old", "old_xml", required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--new", "new_xml", required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--tolerance", default=0.5, show_default=True, type=float, help="Max coordinate difference (px) treated as equal")
+@click.option("--frames/--no-frames", "show_frames", default=False, help="List changed frame numbers per track")
+def diff_cmd(old_xml: str, new_xml: str, tolerance: float, show_frames: bool) -> None:
+    """Report tracks and boxes added, removed or modified between two CVAT XML files."""
+    result = diff_tracks(read_cvat_xml(old_xml), read_cvat_xml(new_xml), tolerance=tolerance)
+    if result.is_empty:
+        click.echo("No differences")
+        return
+
+    click.echo(f"Added tracks:    {','.join(str(t) for t in result.added) or '-'}")
+    click.echo(f"Removed tracks:  {','.join(str(t) for t in result.removed) or '-'}")
+    click.echo(f"Modified tracks: {len(result.modified)}")
+    for change in result.modified.values():
+        parts = [f"+{len(change.added_frames)} -{len(change.removed_frames)} ~{len(change.modified_frames)} boxes"]
+        if change.label_changed:
+            parts.append(f"label {change.old_label} -> {change.new_label}")
+        click.echo(f"  track {change.id}: {', '.join(parts)}")
+        if show_frames:
+            for name, frames in (("added", change.added_frames), ("removed", change.removed_frames), ("modified", change.modified_frames)):
+                if frames:
+                    click.echo(f"    {name}: {_format_frames(frames)}")
+
+
+@main.command("merge3")
+@click.option("--base", required=True, type=click.Path(exists=True, dir_okay=False), help="Common ancestor XML")
+@click.option("--ours", required=True, type=click.Path(exists=True, dir_okay=False), help="First edited copy (wins on conflict)")
+@click.option("--theirs", required=True, type=click.Path(exists=True, dir_okay=False), help="Second edited copy")
+@click.option("--out-xml", required=True, type=click.Path())
+@click.option("--tolerance", default=0.5, show_default=True, type=float, help="Max coordinate difference (px) treated as equal")
+def merge3_cmd(base: str, ours: str, theirs: str, out_xml: str, tolerance: float) -> None:
+    """Three-way merge of two edited copies of a CVAT XML onto their common base."""
+    merged, conflicts = merge3_tracks(read_cvat_xml(base), read_cvat_xml(ours), read_cvat_xml(theirs), tolerance=tolerance)
+    write_cvat_xml(merged, out_xml)
+
+    for c in conflicts:
+        frames = f" at frames {_format_frames(c.frames)}" if c.frames else ""
+        click.echo(f"CONFLICT track {c.track_id}: {c.reason}{frames}", err=True)
+    click.echo(f"Merged {len(merged)} tracks into {out_xml} ({len(conflicts)} conflicts, kept 'ours')")
+
+
+@main.command("split")
+@click.option("--xml", required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--out-dir", required=True, type=click.Path(file_okay=False))
+@click.option("--segment-size", required=True, type=click.IntRange(min=1), help="Frames per segment")
+@click.option("--overlap", type=click.IntRange(min=0), default=None, help="Frames shared by neighbouring segments (default: task meta, capped at segment size - 1)")
+@click.option("--rebase/--no-rebase", default=False, help="Renumber frames of each segment from 0")
+@click.option("--max-open-files", default=64, show_default=True, type=click.IntRange(min=1), help="Segment files written per pass over the input")
+def split_cmd(xml: str, out_dir: str, segment_size: int, overlap: int | None, rebase: bool, max_open_files: int) -> None:
+    """Cut a CVAT XML into per-segment files using CVAT's segment/overlap layout."""
+    try:
+        out_paths = split_cvat_xml(xml, out_dir, segment_size, overlap=overlap, rebase=rebase, max_open_files=max_open_files)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--overlap")
+    click.echo(f"Wrote {len(out_paths)} segments to {out_dir}")
+
+
+@main.command("concat")
+@click.option("--xml", "xmls", required=True, multiple=True, type=click.Path(exists=True, dir_okay=False), help="Segment XML (repeat, in frame order)")
+@click.option("--out-xml", required=True, type=click.Path())
+@click.option("--segment-size", type=click.IntRange(min=1), default=None, help="Treat inputs as rebased segments of this size")
+@click.option("--overlap", type=click.IntRange(min=0), default=None, help="Overlap used with --segment-size (default: first file meta)")
+@click.option("--iou-threshold", default=0.5, show_default=True, type=click.FloatRange(0.0, 1.0), help="Min mean IoU to link tracks across segments")
+def concat_cmd(xmls: tuple[str, ...], out_xml: str, segment_size: int | None, overlap: int | None, iou_threshold: float) -> None:
+    """Join segment XML files into one, linking tracks across overlaps and renumbering IDs."""
+    try:
+        count = concat_cvat_xml(list(xmls), out_xml, segment_size=segment_size, overlap=overlap, iou_threshold=iou_threshold)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--overlap")
+    click.echo(f"Wrote {count} tracks to {out_xml}")
+
+
+@main.command("serve")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Loopback address to bind")
+@click.option("--port", default=8765, show_default=True, type=click.IntRange(0, 65535))
+@click.option("--workers", default=2, show_default=True, type=click.IntRange(min=1), help="Worker processes (each keeps its models warm)")
+@click.option("--max-detect", default=1, show_default=True, type=click.IntRange(min=1), help="Concurrent detect-track jobs")
+@click.option("--max-render", default=2, show_default=True, type=click.IntRange(min=1), help="Concurrent render jobs")
+@click.option("--max-edit", default=4, show_default=True, type=click.IntRange(min=1), help="Concurrent edit jobs")
+@click.option("--preload-model", "preload_models", multiple=True, type=click.Path(exists=True, dir_okay=False), help="Model to load in every worker at start (repeatable)")
+@click.option("--max-finished-jobs", default=1000, show_default=True, type=click.IntRange(min=0), help="Finished jobs kept for GET /jobs (oldest are dropped)")
+def serve_cmd(host: str, port: int, workers: int, max_detect: int, max_render: int, max_edit: int, preload_models: tuple[str, ...], max_finished_jobs: int) -> None:
+    """Run a local HTTP job server for detect-track, render and edit jobs."""
+    if not is_loopback_host(host):
+        raise click.BadParameter("only loopback addresses are allowed", param_hint="--host")
+    limits = {"detect-track": max_detect, "render": max_render, "edit": max_edit}
+
+    def on_ready(server) -> None:
+        click.echo(f"Serving on http://{server.host}:{server.port} ({workers} workers)")
+
+    try:
+        asyncio.run(serve(host, port, workers, limits, list(preload_models), on_ready=on_ready, max_finished_jobs=max_finished_jobs))
+    except KeyboardInterrupt:
+        click.echo("Stopped")
+
+
 if __name__ == "__main__":
     sys.exit(main())
 
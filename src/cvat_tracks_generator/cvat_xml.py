@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, List, Iterable, Optional
+from contextlib import ExitStack
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Iterable, Iterator, Optional
 from lxml import etree
 from datetime import datetime
 import os
@@ -27,6 +28,14 @@ class Track:
     source: str = "manual"
 
 
+@dataclass
+class Segment:
+    id: int
+    start: int
+    stop: int
+    url: str = ""
+
+
 @dataclass
 class TaskMeta:
     id: int = 1
@@ -42,63 +51,101 @@ class TaskMeta:
     width: int = 1920
     height: int = 1080
     source: str = ""
+    segments: List[Segment] = field(default_factory=list)
+    labels: List[str] = field(default_factory=list)
 
 
 def _get_current_timestamp() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f+00:00")
 
 
+def _track_from_element(track_el: etree._Element) -> Track:
+    track_id = int(track_el.get("id"))
+    label = track_el.get("label", "object")
+    source = track_el.get("source", "manual")
+    boxes: List[Box] = []
+    for box_el in track_el.findall("box"):
+        boxes.append(
+            Box(
+                frame=int(box_el.get("frame")),
+                xtl=float(box_el.get("xtl")),
+                ytl=float(box_el.get("ytl")),
+                xbr=float(box_el.get("xbr")),
+                ybr=float(box_el.get("ybr")),
+                outside=int(box_el.get("outside", "0")),
+                occluded=int(box_el.get("occluded", "0")),
+                z_order=int(box_el.get("z_order", "0")),
+            )
+        )
+    boxes.sort(key=lambda b: b.frame)
+    return Track(id=track_id, label=label, boxes=boxes, source=source)
+
+
 def read_cvat_xml(path: str) -> Dict[int, Track]:
-    tree = etree.parse(path)
-    root = tree.getroot()
     tracks: Dict[int, Track] = {}
-    for track_el in root.findall("./track"):
-        track_id = int(track_el.get("id"))
-        label = track_el.get("label", "object")
-        source = track_el.get("source", "manual")
-        boxes: List[Box] = []
-        for box_el in track_el.findall("box"):
-            boxes.append(
-                Box(
-                    frame=int(box_el.get("frame")),
-                    xtl=float(box_el.get("xtl")),
-                    ytl=float(box_el.get("ytl")),
-                    xbr=float(box_el.get("xbr")),
-                    ybr=float(box_el.get("ybr")),
-                    outside=int(box_el.get("outside", "0")),
-                    occluded=int(box_el.get("occluded", "0")),
-                    z_order=int(box_el.get("z_order", "0")),
-                )
-            )
-        boxes.sort(key=lambda b: b.frame)
-        tracks[track_id] = Track(id=track_id, label=label, boxes=boxes, source=source)
+    for track in iter_cvat_tracks(path):
+        tracks[track.id] = track
     return tracks
 
 
-def write_cvat_xml(tracks: Dict[int, Track], path: str, task_meta: Optional[TaskMeta] = None) -> None:
-    root = etree.Element("annotations")
-    
-    # Add version
-    version_el = etree.SubElement(root, "version")
-    version_el.text = "1.1"
-    
-    # Add meta section
-    meta_el = etree.SubElement(root, "meta")
-    
+def iter_cvat_tracks(path: str) -> Iterator[Track]:
+    """Stream tracks from a CVAT XML file without keeping the whole document in memory."""
+    for _, track_el in etree.iterparse(path, events=("end",), tag="track"):
+        yield _track_from_element(track_el)
+        track_el.clear()
+        parent = track_el.getparent()
+        while track_el.getprevious() is not None:
+            del parent[0]
+
+
+def read_task_meta(path: str) -> Optional[TaskMeta]:
+    """Read the <meta><task> section of a CVAT XML file; returns None if the file has none."""
+    task_el = None
+    for _, el in etree.iterparse(path, events=("end",), tag=("task", "track")):
+        if el.tag == "task" and el.getparent() is not None and el.getparent().tag == "meta":
+            task_el = el
+        break
+    if task_el is None:
+        return None
+
+    def text(tag: str, default: str = "") -> str:
+        value = task_el.findtext(tag)
+        return value if value else default
+
+    meta = TaskMeta()
+    return TaskMeta(
+        id=int(text("id", str(meta.id))),
+        name=text("name", meta.name),
+        size=int(text("size", str(meta.size))),
+        mode=text("mode", meta.mode),
+        overlap=int(text("overlap", str(meta.overlap))),
+        created=text("created"),
+        updated=text("updated"),
+        subset=text("subset", meta.subset),
+        start_frame=int(text("start_frame", str(meta.start_frame))),
+        stop_frame=int(text("stop_frame", str(meta.stop_frame))),
+        width=int(task_el.findtext("original_size/width") or meta.width),
+        height=int(task_el.findtext("original_size/height") or meta.height),
+        source=text("source"),
+        segments=[
+            Segment(
+                id=int(seg_el.findtext("id") or 0),
+                start=int(seg_el.findtext("start") or 0),
+                stop=int(seg_el.findtext("stop") or 0),
+                url=seg_el.findtext("url") or "",
+            )
+            for seg_el in task_el.findall("segments/segment")
+        ],
+        labels=[name for name in (label_el.findtext("name") for label_el in task_el.findall("labels/label")) if name],
+    )
+
+
+def _build_meta_element(task_meta: TaskMeta, labels: Iterable[str]) -> etree._Element:
+    meta_el = etree.Element("meta")
+
     # Task info
     task_el = etree.SubElement(meta_el, "task")
-    
-    if task_meta is None:
-        # Generate default meta
-        max_frame = max((max((b.frame for b in t.boxes), default=0) for t in tracks.values()), default=0)
-        task_meta = TaskMeta(
-            size=max_frame + 1,
-            stop_frame=max_frame,
-            created=_get_current_timestamp(),
-            updated=_get_current_timestamp(),
-            source=os.path.basename(path).replace('.xml', '.mp4')
-        )
-    
+
     # Task fields
     etree.SubElement(task_el, "id").text = str(task_meta.id)
     etree.SubElement(task_el, "name").text = task_meta.name
@@ -112,64 +159,127 @@ def write_cvat_xml(tracks: Dict[int, Track], path: str, task_meta: Optional[Task
     etree.SubElement(task_el, "start_frame").text = str(task_meta.start_frame)
     etree.SubElement(task_el, "stop_frame").text = str(task_meta.stop_frame)
     etree.SubElement(task_el, "frame_filter")
-    
-    # Segments
+
+    # Segments (single whole-task segment unless explicitly provided)
+    segments = task_meta.segments or [Segment(id=task_meta.id, start=task_meta.start_frame, stop=task_meta.stop_frame)]
     segments_el = etree.SubElement(task_el, "segments")
-    segment_el = etree.SubElement(segments_el, "segment")
-    etree.SubElement(segment_el, "id").text = str(task_meta.id)
-    etree.SubElement(segment_el, "start").text = str(task_meta.start_frame)
-    etree.SubElement(segment_el, "stop").text = str(task_meta.stop_frame)
-    etree.SubElement(segment_el, "url").text = ""
-    
+    for segment in segments:
+        segment_el = etree.SubElement(segments_el, "segment")
+        etree.SubElement(segment_el, "id").text = str(segment.id)
+        etree.SubElement(segment_el, "start").text = str(segment.start)
+        etree.SubElement(segment_el, "stop").text = str(segment.stop)
+        etree.SubElement(segment_el, "url").text = segment.url
+
     # Owner
     owner_el = etree.SubElement(task_el, "owner")
     etree.SubElement(owner_el, "username").text = "generator"
     etree.SubElement(owner_el, "email").text = ""
-    
+
     etree.SubElement(task_el, "assignee")
-    
+
     # Labels
     labels_el = etree.SubElement(task_el, "labels")
-    unique_labels = set(t.label for t in tracks.values())
     colors = ["#ff1616", "#004fff", "#b83df5", "#00ff00", "#ffff00", "#ff00ff", "#00ffff"]
-    for i, label in enumerate(unique_labels):
+    for i, label in enumerate(labels):
         label_el = etree.SubElement(labels_el, "label")
         etree.SubElement(label_el, "name").text = label
         etree.SubElement(label_el, "color").text = colors[i % len(colors)]
         etree.SubElement(label_el, "type").text = "rectangle"
         etree.SubElement(label_el, "attributes")
-    
+
     # Original size
     orig_size_el = etree.SubElement(task_el, "original_size")
     etree.SubElement(orig_size_el, "width").text = str(task_meta.width)
     etree.SubElement(orig_size_el, "height").text = str(task_meta.height)
-    
+
     # Source
     etree.SubElement(task_el, "source").text = task_meta.source
-    
+
     # Dumped timestamp
     etree.SubElement(meta_el, "dumped").text = _get_current_timestamp()
-    
-    # Tracks
-    for track in tracks.values():
-        tr_el = etree.SubElement(root, "track", id=str(track.id), label=track.label, source=track.source)
-        for b in sorted(track.boxes, key=lambda bb: bb.frame):
-            etree.SubElement(
-                tr_el,
-                "box",
-                frame=str(b.frame),
-                keyframe="1",
-                outside=str(b.outside),
-                occluded=str(b.occluded),
-                xtl=str(b.xtl),
-                ytl=str(b.ytl),
-                xbr=str(b.xbr),
-                ybr=str(b.ybr),
-                z_order=str(b.z_order),
-            )
-    
-    tree = etree.ElementTree(root)
-    tree.write(path, pretty_print=True, xml_declaration=True, encoding="utf-8")
+    return meta_el
+
+
+def _build_track_element(track: Track) -> etree._Element:
+    tr_el = etree.Element("track", id=str(track.id), label=track.label, source=track.source)
+    for b in sorted(track.boxes, key=lambda bb: bb.frame):
+        etree.SubElement(
+            tr_el,
+            "box",
+            frame=str(b.frame),
+            keyframe="1",
+            outside=str(b.outside),
+            occluded=str(b.occluded),
+            xtl=str(b.xtl),
+            ytl=str(b.ytl),
+            xbr=str(b.xbr),
+            ybr=str(b.ybr),
+            z_order=str(b.z_order),
+        )
+    return tr_el
+
+
+class CvatXmlWriter:
+    """Incrementally write a CVAT for video 1.1 file, one track at a time.
+
+    The meta section is written on enter, so labels must be known up front
+    (taken from ``task_meta.labels``).
+    """
+
+    def __init__(self, path: str, task_meta: TaskMeta) -> None:
+        self.path = path
+        self.task_meta = task_meta
+        self._stack: Optional[ExitStack] = None
+        self._xf = None
+
+    def __enter__(self) -> "CvatXmlWriter":
+        self._stack = ExitStack()
+        self._xf = self._stack.enter_context(etree.xmlfile(self.path, encoding="utf-8"))
+        self._xf.write_declaration()
+        self._stack.enter_context(self._xf.element("annotations"))
+        self._xf.write("\n")
+
+        version_el = etree.Element("version")
+        version_el.text = "1.1"
+        self._write_element(version_el)
+        self._write_element(_build_meta_element(self.task_meta, self.task_meta.labels))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        assert self._stack is not None
+        self._stack.__exit__(*exc_info)
+        self._stack = None
+        self._xf = None
+
+    def _write_element(self, el: etree._Element) -> None:
+        etree.indent(el, level=1)
+        el.tail = "\n"
+        self._xf.write("  ")
+        self._xf.write(el)
+
+    def write(self, track: Track) -> None:
+        self._write_element(_build_track_element(track))
+
+
+def write_cvat_xml(tracks: Dict[int, Track], path: str, task_meta: Optional[TaskMeta] = None) -> None:
+    if task_meta is None:
+        # Generate default meta
+        max_frame = max((max((b.frame for b in t.boxes), default=0) for t in tracks.values()), default=0)
+        task_meta = TaskMeta(
+            size=max_frame + 1,
+            stop_frame=max_frame,
+            created=_get_current_timestamp(),
+            updated=_get_current_timestamp(),
+            source=os.path.basename(path).replace('.xml', '.mp4')
+        )
+
+    # Labels: declared ones first, then any used by tracks
+    labels = list(dict.fromkeys([*task_meta.labels, *(t.label for t in tracks.values())]))
+    task_meta = replace(task_meta, labels=labels)
+
+    with CvatXmlWriter(path, task_meta) as writer:
+        for track in tracks.values():
+            writer.write(track)
 
 
 def _boxes_to_map(boxes: Iterable[Box]) -> Dict[int, Box]:
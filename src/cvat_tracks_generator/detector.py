@@ -1,41 +1,53 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Callable, Dict, Optional
 import cv2
+import numpy as np
 from ultralytics import YOLO
 
-from .cvat_xml import write_cvat_xml
-from .tracker import run_bytetrack
-from .utils import video_meta, create_video_writer
+from .cvat_xml import Track, write_cvat_xml
+from .tracker import ByteTrackRunner
+from .utils import create_video_writer
+from .video import VideoSource, FrameConsumer
 
 
-def detect_and_track_to_xml(model_path: str, video_path: str, out_xml_path: str, out_video_path: Optional[str], use_sahi: bool = False) -> None:
+def detect_and_track_to_xml(
+    model_path: str,
+    video_path: str,
+    out_xml_path: str,
+    out_video_path: Optional[str],
+    use_sahi: bool = False,
+    model: Optional[YOLO] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[int, Track]:
     # For MVP: run full-frame inference with built-in tracker (ByteTrack) via Ultralytics
-    model = YOLO(model_path)
-    tracks = run_bytetrack(model, video_path)
-
-    # Optional visualization: re-run once for frames to draw overlays as we write
-    if out_video_path is not None:
-        width, height, fps, _ = video_meta(video_path)
-        writer = create_video_writer(out_video_path, width, height, fps)
-        # Replay detections for visualization using model.track stream
-        frame_index = -1
-        for result in model.track(source=video_path, tracker="bytetrack.yaml", stream=True, verbose=False):
-            frame_index += 1
-            img = result.orig_img
-            if result.boxes is None:
-                writer.write(img)
-                continue
-            boxes_xyxy = result.boxes.xyxy.cpu().numpy()
-            ids = result.boxes.id.cpu().numpy() if result.boxes.id is not None else None
-            if ids is not None:
-                for i in range(boxes_xyxy.shape[0]):
-                    tid = int(ids[i])
-                    x1, y1, x2, y2 = boxes_xyxy[i].astype(int).tolist()
+    if model is None:
+        model = YOLO(model_path)
+    runner = ByteTrackRunner(model)
+    consumers: list[FrameConsumer] = [runner]
+
+    with VideoSource(video_path) as source:
+        writer = None
+        # Optional visualization: draw the tracker output of each frame in the same decode pass
+        if out_video_path is not None:
+            writer = create_video_writer(out_video_path, source.width, source.height, source.fps)
+
+            def draw(frame_index: int, img: np.ndarray) -> None:
+                for tid, box in runner.last_boxes:
+                    x1, y1, x2, y2 = (int(v) for v in box)
                     cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
                     cv2.putText(img, f"ID {tid}", (x1, max(0, y1 - 5)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2, cv2.LINE_AA)
-            writer.write(img)
-        writer.release()
+                writer.write(img)
 
-    write_cvat_xml(tracks, out_xml_path)
+            consumers.append(draw)
+        if progress is not None:
+            consumers.append(lambda frame_index, _: progress(frame_index + 1, source.frame_count))
+        try:
+            source.fan_out(consumers)
+        finally:
+            if writer is not None:
+                writer.release()
 
+    tracks = runner.result()
+    write_cvat_xml(tracks, out_xml_path)
+    return tracks
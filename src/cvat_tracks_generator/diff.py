@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from .cvat_xml import Track, Box
+
+
+@dataclass
+class TrackChange:
+    id: int
+    added_frames: List[int] = field(default_factory=list)
+    removed_frames: List[int] = field(default_factory=list)
+    modified_frames: List[int] = field(default_factory=list)
+    old_label: Optional[str] = None
+    new_label: Optional[str] = None
+
+    @property
+    def label_changed(self) -> bool:
+        return self.old_label != self.new_label
+
+
+@dataclass
+class TracksDiff:
+    added: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    modified: Dict[int, TrackChange] = field(default_factory=dict)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.modified)
+
+
+@dataclass
+class MergeConflict:
+    track_id: int
+    reason: str
+    frames: List[int] = field(default_factory=list)
+
+
+def _track_arrays(track: Optional[Track]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (frames, values) for a track; values columns are xtl, ytl, xbr, ybr, outside, occluded, z_order."""
+    if track is None or not track.boxes:
+        return np.empty(0, dtype=np.int64), np.empty((0, 7), dtype=np.float64)
+    frames = np.fromiter((b.frame for b in track.boxes), dtype=np.int64, count=len(track.boxes))
+    values = np.array([(b.xtl, b.ytl, b.xbr, b.ybr, b.outside, b.occluded, b.z_order) for b in track.boxes], dtype=np.float64)
+    order = np.argsort(frames, kind="stable")
+    return frames[order], values[order]
+
+
+def _align(frames_all: np.ndarray, frames: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Project (frames, values) onto the sorted frame axis frames_all; returns (present mask, aligned values)."""
+    aligned = np.zeros((frames_all.size, 7), dtype=np.float64)
+    if frames.size == 0:
+        return np.zeros(frames_all.size, dtype=bool), aligned
+    idx = np.minimum(np.searchsorted(frames, frames_all), frames.size - 1)
+    present = frames[idx] == frames_all
+    aligned[present] = values[idx[present]]
+    return present, aligned
+
+
+def _values_differ(a: np.ndarray, b: np.ndarray, tolerance: float) -> np.ndarray:
+    coords = np.any(np.abs(a[:, :4] - b[:, :4]) > tolerance, axis=1)
+    flags = np.any(a[:, 4:] != b[:, 4:], axis=1)
+    return coords | flags
+
+
+def _changed(pres_a: np.ndarray, val_a: np.ndarray, pres_b: np.ndarray, val_b: np.ndarray, tolerance: float) -> np.ndarray:
+    return (pres_a != pres_b) | (pres_a & pres_b & _values_differ(val_a, val_b, tolerance))
+
+
+def _boxes_from_arrays(frames: np.ndarray, values: np.ndarray) -> List[Box]:
+    return [
+        Box(frame=int(f), xtl=float(v[0]), ytl=float(v[1]), xbr=float(v[2]), ybr=float(v[3]), outside=int(v[4]), occluded=int(v[5]), z_order=int(v[6]))
+        for f, v in zip(frames.tolist(), values)
+    ]
+
+
+def _flatten(tracks: List[Track]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Flatten all boxes into (track_index, frames, values) arrays sorted by (track_index, frame).
+
+    ``track_index`` is the position in ``tracks``; values columns are as in ``_track_arrays``.
+    """
+    boxes = [b for t in tracks for b in t.boxes]
+    index = np.repeat(np.arange(len(tracks), dtype=np.int64), [len(t.boxes) for t in tracks])
+    frames = np.array([b.frame for b in boxes], dtype=np.int64)
+    values = np.empty((len(boxes), 7), dtype=np.float64)
+    values[:, 0] = [b.xtl for b in boxes]
+    values[:, 1] = [b.ytl for b in boxes]
+    values[:, 2] = [b.xbr for b in boxes]
+    values[:, 3] = [b.ybr for b in boxes]
+    values[:, 4] = [b.outside for b in boxes]
+    values[:, 5] = [b.occluded for b in boxes]
+    values[:, 6] = [b.z_order for b in boxes]
+    order = np.lexsort((frames, index))
+    return index[order], frames[order], values[order]
+
+
+def _group_frames(index: np.ndarray, frames: np.ndarray) -> Dict[int, List[int]]:
+    """Split frames sorted by (track_index, frame) into per-track lists."""
+    if index.size == 0:
+        return {}
+    cuts = (np.flatnonzero(index[1:] != index[:-1]) + 1).tolist()
+    starts = [0] + cuts
+    frame_list = frames.tolist()
+    return {i: frame_list[lo:hi] for i, lo, hi in zip(index[starts].tolist(), starts, cuts + [index.size])}
+
+
+def _diff_boxes(old: List[Track], new: List[Track], tolerance: float) -> Dict[int, Tuple[List[int], List[int], List[int]]]:
+    """Box-level changes between paired tracks ``old[i]`` and ``new[i]``, in one vectorized pass.
+
+    Boxes of each side are flattened into one array keyed by (track_index, frame) and aligned
+    with a single ``searchsorted``, so the number of numpy calls does not depend on the number
+    of tracks. Returns {track_index: (added, removed, modified frames)} for changed tracks only.
+    """
+    o_index, o_frames, o_values = _flatten(old)
+    n_index, n_frames, n_values = _flatten(new)
+    if o_frames.size == 0 and n_frames.size == 0:
+        return {}
+    lowest = min(o_frames.min(initial=0), n_frames.min(initial=0))
+    span = max(o_frames.max(initial=0), n_frames.max(initial=0)) - lowest + 1
+    o_key = o_index * span + (o_frames - lowest)
+    n_key = n_index * span + (n_frames - lowest)
+
+    pos = np.minimum(np.searchsorted(n_key, o_key), max(n_key.size - 1, 0))
+    found = (n_key[pos] == o_key) if n_key.size else np.zeros(o_key.size, dtype=bool)
+    o_pair = np.flatnonzero(found)
+    n_pair = pos[found]
+    in_old = np.zeros(n_key.size, dtype=bool)
+    in_old[n_pair] = True
+    differ = _values_differ(o_values[o_pair], n_values[n_pair], tolerance)
+
+    added = _group_frames(n_index[~in_old], n_frames[~in_old])
+    removed = _group_frames(o_index[~found], o_frames[~found])
+    modified = _group_frames(o_index[o_pair[differ]], o_frames[o_pair[differ]])
+    return {i: (added.get(i, []), removed.get(i, []), modified.get(i, [])) for i in sorted(added.keys() | removed.keys() | modified.keys())}
+
+
+def diff_track(old: Track, new: Track, tolerance: float = 0.5) -> Optional[TrackChange]:
+    """Compare two versions of one track; returns None when they match within tolerance."""
+    return diff_tracks({new.id: old}, {new.id: new}, tolerance).modified.get(new.id)
+
+
+def diff_tracks(old: Dict[int, Track], new: Dict[int, Track], tolerance: float = 0.5) -> TracksDiff:
+    """Report tracks and boxes added, removed or modified between two annotation versions.
+
+    Boxes of all common tracks are compared in a single vectorized pass rather than per track.
+    """
+    common = sorted(set(old) & set(new))
+    result = TracksDiff(
+        added=sorted(set(new) - set(old)),
+        removed=sorted(set(old) - set(new)),
+    )
+    boxes = _diff_boxes([old[tid] for tid in common], [new[tid] for tid in common], tolerance)
+    for i, tid in enumerate(common):
+        added, removed, modified = boxes.get(i, ([], [], []))
+        change = TrackChange(
+            id=tid,
+            added_frames=added,
+            removed_frames=removed,
+            modified_frames=modified,
+            old_label=old[tid].label,
+            new_label=new[tid].label,
+        )
+        if added or removed or modified or change.label_changed:
+            result.modified[tid] = change
+    return result
+
+
+def _merge3_track(
+    base: Optional[Track], ours: Track, theirs: Track, tolerance: float
+) -> Tuple[Track, List[int], bool]:
+    """Merge two edited versions of a track box by box; returns (track, conflicting frames, label conflict)."""
+    b_frames, b_values = _track_arrays(base)
+    o_frames, o_values = _track_arrays(ours)
+    t_frames, t_values = _track_arrays(theirs)
+    frames_all = np.union1d(np.union1d(b_frames, o_frames), t_frames)
+
+    b_pres, b_val = _align(frames_all, b_frames, b_values)
+    o_pres, o_val = _align(frames_all, o_frames, o_values)
+    t_pres, t_val = _align(frames_all, t_frames, t_values)
+
+    ours_changed = _changed(b_pres, b_val, o_pres, o_val, tolerance)
+    theirs_changed = _changed(b_pres, b_val, t_pres, t_val, tolerance)
+    conflict = ours_changed & theirs_changed & _changed(o_pres, o_val, t_pres, t_val, tolerance)
+
+    # Take theirs only where ours is untouched; otherwise ours wins (including conflicts)
+    take_theirs = theirs_changed & ~ours_changed
+    pres = np.where(take_theirs, t_pres, o_pres)
+    vals = np.where(take_theirs[:, None], t_val, o_val)
+
+    base_label = base.label if base is not None else None
+    label = theirs.label if ours.label == base_label else ours.label
+    label_conflict = ours.label != base_label and theirs.label != base_label and ours.label != theirs.label
+
+    merged = Track(id=ours.id, label=label, boxes=_boxes_from_arrays(frames_all[pres], vals[pres]), source=ours.source)
+    return merged, frames_all[conflict].tolist(), label_conflict
+
+
+def merge3_tracks(
+    base: Dict[int, Track], ours: Dict[int, Track], theirs: Dict[int, Track], tolerance: float = 0.5
+) -> Tuple[Dict[int, Track], List[MergeConflict]]:
+    """Apply changes from two edited copies onto a common base.
+
+    Non-conflicting track and box changes from both sides are combined. When both sides change
+    the same box (or label) differently, the ``ours`` value is kept and a conflict is reported.
+    A track deleted on one side but edited on the other is kept with its edits. Tracks added on
+    both sides under the same ID with different content keep the ID for ``ours`` and move the
+    ``theirs`` track to a fresh ID, which is reported as a conflict.
+    """
+    merged: Dict[int, Track] = {}
+    conflicts: List[MergeConflict] = []
+    next_id = max(set(base) | set(ours) | set(theirs), default=0) + 1
+
+    for tid in sorted(set(base) | set(ours) | set(theirs)):
+        b, o, t = base.get(tid), ours.get(tid), theirs.get(tid)
+
+        if o is None and t is None:
+            continue
+        if o is None or t is None:
+            present = o if o is not None else t
+            if b is None:
+                merged[tid] = present
+            elif diff_track(b, present, tolerance) is not None:
+                merged[tid] = present
+                conflicts.append(MergeConflict(track_id=tid, reason="deleted on one side, modified on the other"))
+            continue
+
+        if b is None and diff_track(o, t, tolerance) is not None:
+            merged[tid] = o
+            merged[next_id] = Track(id=next_id, label=t.label, boxes=t.boxes, source=t.source)
+            conflicts.append(MergeConflict(track_id=tid, reason=f"added on both sides with different content; 'theirs' track moved to ID {next_id}"))
+            next_id += 1
+            continue
+
+        track, conflict_frames, label_conflict = _merge3_track(b, o, t, tolerance)
+        merged[tid] = track
+        if label_conflict:
+            conflicts.append(MergeConflict(track_id=tid, reason=f"label changed on both sides ({o.label!r} vs {t.label!r})"))
+        if conflict_frames:
+            conflicts.append(MergeConflict(track_id=tid, reason="boxes changed on both sides", frames=conflict_frames))
+
+    return merged, conflicts
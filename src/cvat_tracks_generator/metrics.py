@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+import numpy as np
+import lap
+
+from .cvat_xml import Track
+
+
+@dataclass
+class TrackStats:
+    id: int
+    length: int
+    matched: int = 0
+    id_switches: int = 0
+    pred_ids: List[int] = field(default_factory=list)
+
+    @property
+    def coverage(self) -> float:
+        return self.matched / self.length if self.length else 0.0
+
+
+@dataclass
+class EvalResult:
+    num_frames: int = 0
+    num_gt: int = 0
+    num_pred: int = 0
+    tp: int = 0
+    fp: int = 0
+    fn: int = 0
+    id_switches: int = 0
+    idtp: int = 0
+    iou_sum: float = 0.0
+    track_stats: Dict[int, TrackStats] = field(default_factory=dict)
+
+    @property
+    def mota(self) -> float:
+        if not self.num_gt:
+            return 0.0
+        return 1.0 - (self.fn + self.fp + self.id_switches) / self.num_gt
+
+    @property
+    def motp(self) -> float:
+        return self.iou_sum / self.tp if self.tp else 0.0
+
+    @property
+    def precision(self) -> float:
+        return self.tp / self.num_pred if self.num_pred else 0.0
+
+    @property
+    def recall(self) -> float:
+        return self.tp / self.num_gt if self.num_gt else 0.0
+
+    @property
+    def idp(self) -> float:
+        return self.idtp / self.num_pred if self.num_pred else 0.0
+
+    @property
+    def idr(self) -> float:
+        return self.idtp / self.num_gt if self.num_gt else 0.0
+
+    @property
+    def idf1(self) -> float:
+        total = self.num_gt + self.num_pred
+        return 2 * self.idtp / total if total else 0.0
+
+    @property
+    def mostly_tracked(self) -> int:
+        return sum(1 for s in self.track_stats.values() if s.coverage >= 0.8)
+
+    @property
+    def mostly_lost(self) -> int:
+        return sum(1 for s in self.track_stats.values() if s.coverage < 0.2)
+
+
+def tracks_to_arrays(tracks: Dict[int, Track]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Flatten visible boxes into (frames, track_ids, xyxy) arrays sorted by frame."""
+    frames: List[int] = []
+    ids: List[int] = []
+    coords: List[Tuple[float, float, float, float]] = []
+    for t in tracks.values():
+        for b in t.boxes:
+            if b.outside:
+                continue
+            frames.append(b.frame)
+            ids.append(t.id)
+            coords.append((b.xtl, b.ytl, b.xbr, b.ybr))
+    frames_arr = np.asarray(frames, dtype=np.int64)
+    ids_arr = np.asarray(ids, dtype=np.int64)
+    boxes_arr = np.asarray(coords, dtype=np.float64).reshape(-1, 4)
+    order = np.argsort(frames_arr, kind="stable")
+    return frames_arr[order], ids_arr[order], boxes_arr[order]
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Element-wise IoU of xyxy boxes in the last axis; leading axes broadcast."""
+    ix1 = np.maximum(a[..., 0], b[..., 0])
+    iy1 = np.maximum(a[..., 1], b[..., 1])
+    ix2 = np.minimum(a[..., 2], b[..., 2])
+    iy2 = np.minimum(a[..., 3], b[..., 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy box arrays."""
+    return box_iou(a[:, None, :], b[None, :, :])
+
+
+def _assign(iou: np.ndarray, iou_threshold: float, prev_match: np.ndarray, p_t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Match GT rows to pred columns, CLEAR-MOT style.
+
+    Correspondences from earlier frames (``prev_match`` per row, pred track index or -1) are
+    kept while their IoU stays above the threshold; remaining rows and columns are assigned
+    with the Hungarian method. Each column is used at most once.
+    """
+    kept_rows, kept_cols = np.nonzero((prev_match[:, None] >= 0) & (prev_match[:, None] == p_t[None, :]))
+    valid = iou[kept_rows, kept_cols] >= iou_threshold
+    kept_rows, kept_cols = kept_rows[valid], kept_cols[valid]
+    _, first = np.unique(kept_cols, return_index=True)
+    kept_rows, kept_cols = kept_rows[first], kept_cols[first]
+
+    free_rows = np.setdiff1d(np.arange(iou.shape[0]), kept_rows)
+    free_cols = np.setdiff1d(np.arange(iou.shape[1]), kept_cols)
+    if free_rows.size == 0 or free_cols.size == 0:
+        return kept_rows, kept_cols
+    sub = iou[np.ix_(free_rows, free_cols)]
+    _, x, _ = lap.lapjv(1.0 - sub, extend_cost=True, cost_limit=1.0 - iou_threshold + 1e-9)
+    rows = np.nonzero(x >= 0)[0]
+    cols = x[rows]
+    keep = sub[rows, cols] >= iou_threshold
+    return np.concatenate([kept_rows, free_rows[rows[keep]]]), np.concatenate([kept_cols, free_cols[cols[keep]]])
+
+
+def _global_id_matches(pair_codes: np.ndarray, num_pred_tracks: int) -> int:
+    """Best one-to-one GT/pred track association by overlapping frame count (IDTP)."""
+    if pair_codes.size == 0:
+        return 0
+    codes, counts = np.unique(pair_codes, return_counts=True)
+    g_idx, g_inv = np.unique(codes // num_pred_tracks, return_inverse=True)
+    p_idx, p_inv = np.unique(codes % num_pred_tracks, return_inverse=True)
+    cost = np.zeros((g_idx.size, p_idx.size), dtype=np.float64)
+    cost[g_inv, p_inv] = -counts
+    total, _, _ = lap.lapjv(cost, extend_cost=True)
+    return int(round(-total))
+
+
+def evaluate_tracks(gt: Dict[int, Track], pred: Dict[int, Track], iou_threshold: float = 0.5) -> EvalResult:
+    """Compare predicted tracks against ground truth (CLEAR MOT and identity metrics)."""
+    g_frames, g_ids, g_boxes = tracks_to_arrays(gt)
+    p_frames, p_ids, p_boxes = tracks_to_arrays(pred)
+    g_uids, g_tidx = np.unique(g_ids, return_inverse=True)
+    p_uids, p_tidx = np.unique(p_ids, return_inverse=True)
+    n_g_tracks = g_uids.size
+    n_p_tracks = max(p_uids.size, 1)
+
+    frames = np.union1d(g_frames, p_frames)
+    g_start = np.searchsorted(g_frames, frames, side="left")
+    g_stop = np.searchsorted(g_frames, frames, side="right")
+    p_start = np.searchsorted(p_frames, frames, side="left")
+    p_stop = np.searchsorted(p_frames, frames, side="right")
+
+    result = EvalResult(num_frames=int(frames.size), num_gt=int(g_frames.size), num_pred=int(p_frames.size))
+    last_match = np.full(n_g_tracks, -1, dtype=np.int64)
+    last_gt = np.full(n_p_tracks, -1, dtype=np.int64)
+    switches = np.zeros(n_g_tracks, dtype=np.int64)
+    matched_g: List[np.ndarray] = []
+    matched_codes: List[np.ndarray] = []
+    overlap_codes: List[np.ndarray] = []
+
+    for gs, ge, ps, pe in zip(g_start, g_stop, p_start, p_stop):
+        if gs == ge or ps == pe:
+            continue
+        iou = iou_matrix(g_boxes[gs:ge], p_boxes[ps:pe])
+        g_t = g_tidx[gs:ge]
+        p_t = p_tidx[ps:pe]
+
+        oi, oj = np.nonzero(iou >= iou_threshold)
+        if oi.size == 0:
+            continue
+        overlap_codes.append(g_t[oi] * n_p_tracks + p_t[oj])
+
+        # Only mutual correspondences carry over: the pred track may since have followed another GT
+        prev_match = last_match[g_t]
+        mutual = (prev_match >= 0) & (last_gt[np.maximum(prev_match, 0)] == g_t)
+        rows, cols = _assign(iou, iou_threshold, np.where(mutual, prev_match, -1), p_t)
+        gm = g_t[rows]
+        pm = p_t[cols]
+        prev = last_match[gm]
+        switched = (prev >= 0) & (prev != pm)
+        np.add.at(switches, gm[switched], 1)
+        last_match[gm] = pm
+        last_gt[pm] = gm
+
+        result.tp += int(rows.size)
+        result.iou_sum += float(iou[rows, cols].sum())
+        matched_g.append(gm)
+        matched_codes.append(gm * n_p_tracks + pm)
+
+    result.fn = result.num_gt - result.tp
+    result.fp = result.num_pred - result.tp
+    result.id_switches = int(switches.sum())
+    result.idtp = _global_id_matches(
+        np.concatenate(overlap_codes) if overlap_codes else np.empty(0, dtype=np.int64), n_p_tracks
+    )
+
+    lengths = np.bincount(g_tidx, minlength=n_g_tracks)
+    matched = np.bincount(np.concatenate(matched_g), minlength=n_g_tracks) if matched_g else np.zeros(n_g_tracks, dtype=np.int64)
+    partners: Dict[int, List[int]] = {}
+    if matched_codes:
+        for code in np.unique(np.concatenate(matched_codes)).tolist():
+            partners.setdefault(code // n_p_tracks, []).append(int(p_uids[code % n_p_tracks]))
+    for i, tid in enumerate(g_uids.tolist()):
+        result.track_stats[tid] = TrackStats(
+            id=tid,
+            length=int(lengths[i]),
+            matched=int(matched[i]),
+            id_switches=int(switches[i]),
+            pred_ids=partners.get(i, []),
+        )
+    return result
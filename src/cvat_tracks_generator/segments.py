@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from contextlib import ExitStack
+from dataclasses import replace
+from operator import attrgetter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import lap
+
+from .cvat_xml import (
+    Box,
+    Track,
+    TaskMeta,
+    Segment,
+    CvatXmlWriter,
+    iter_cvat_tracks,
+    read_task_meta,
+    _get_current_timestamp,
+)
+from .metrics import iou_matrix
+
+
+def segment_ranges(start_frame: int, stop_frame: int, segment_size: int, overlap: int) -> List[Segment]:
+    """Split [start_frame, stop_frame] into CVAT segments of segment_size frames sharing overlap frames."""
+    if segment_size <= 0:
+        raise ValueError("segment_size must be positive")
+    if not 0 <= overlap < segment_size:
+        raise ValueError("overlap must be in [0, segment_size)")
+    step = segment_size - overlap
+    segments: List[Segment] = []
+    start = start_frame
+    while True:
+        stop = min(start + segment_size - 1, stop_frame)
+        segments.append(Segment(id=len(segments), start=start, stop=stop))
+        if stop >= stop_frame:
+            break
+        start += step
+    return segments
+
+
+def slice_track(track: Track, start: int, stop: int, offset: int = 0) -> Optional[Track]:
+    """Return the part of a track with frames in [start, stop], shifted by -offset; None if empty.
+
+    Boxes must be sorted by frame (as returned by the readers).
+    """
+    lo = bisect_left(track.boxes, start, key=attrgetter("frame"))
+    hi = bisect_right(track.boxes, stop, key=attrgetter("frame"))
+    if lo >= hi:
+        return None
+    boxes = track.boxes[lo:hi]
+    if offset:
+        boxes = [replace(b, frame=b.frame - offset) for b in boxes]
+    return Track(id=track.id, label=track.label, boxes=boxes, source=track.source)
+
+
+def _shift_track(track: Track, offset: int) -> Track:
+    if not offset:
+        return track
+    return Track(id=track.id, label=track.label, boxes=[replace(b, frame=b.frame + offset) for b in track.boxes], source=track.source)
+
+
+def _scan_tracks(path: str) -> Tuple[List[str], int, int]:
+    """Stream a file once to collect its labels and frame range."""
+    labels: Dict[str, None] = {}
+    first, last = None, None
+    for track in iter_cvat_tracks(path):
+        labels[track.label] = None
+        if track.boxes:
+            first = track.boxes[0].frame if first is None else min(first, track.boxes[0].frame)
+            last = track.boxes[-1].frame if last is None else max(last, track.boxes[-1].frame)
+    return list(labels), first or 0, last or 0
+
+
+def _load_meta(path: str) -> TaskMeta:
+    """Task meta of a file, filling in labels and frame range by scanning tracks when the meta lacks them."""
+    meta = read_task_meta(path)
+    if meta is not None and meta.labels:
+        return meta
+    labels, first, last = _scan_tracks(path)
+    if meta is None:
+        return TaskMeta(size=last - first + 1, start_frame=first, stop_frame=last, labels=labels)
+    return replace(meta, labels=labels)
+
+
+def split_cvat_xml(
+    path: str,
+    out_dir: str,
+    segment_size: int,
+    overlap: Optional[int] = None,
+    rebase: bool = False,
+    max_open_files: int = 64,
+) -> List[str]:
+    """Cut a CVAT XML file into per-segment files following CVAT's segment/overlap layout.
+
+    Tracks are streamed from the input and written to every segment they intersect. With
+    ``rebase`` each output starts at frame 0; otherwise original frame numbers are kept.
+    At most ``max_open_files`` outputs are open at a time; more segments than that are
+    written in batches, re-streaming the input once per batch. Without ``overlap`` the task
+    meta overlap is used, clamped to ``segment_size - 1``. Returns the written file paths.
+    """
+    meta = _load_meta(path)
+    if overlap is None:
+        overlap = max(0, min(meta.overlap, segment_size - 1))
+    segments = segment_ranges(meta.start_frame, meta.stop_frame, segment_size, overlap)
+    stops = [s.stop for s in segments]
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    stem = Path(path).stem
+    out_paths = [str(out / f"{stem}_{s.id:04d}.xml") for s in segments]
+    batch_size = max(1, max_open_files)
+
+    for batch_start in range(0, len(segments), batch_size):
+        batch_stop = min(batch_start + batch_size, len(segments))
+        with ExitStack() as stack:
+            writers: Dict[int, CvatXmlWriter] = {}
+            for j in range(batch_start, batch_stop):
+                seg = segments[j]
+                offset = seg.start if rebase else 0
+                start, stop = seg.start - offset, seg.stop - offset
+                seg_meta = replace(
+                    meta,
+                    size=stop - start + 1,
+                    overlap=overlap,
+                    start_frame=start,
+                    stop_frame=stop,
+                    updated=_get_current_timestamp(),
+                    segments=[Segment(id=seg.id, start=start, stop=stop)],
+                )
+                writers[j] = stack.enter_context(CvatXmlWriter(out_paths[j], seg_meta))
+
+            for track in iter_cvat_tracks(path):
+                if not track.boxes:
+                    continue
+                last = track.boxes[-1].frame
+                j = max(bisect_left(stops, track.boxes[0].frame), batch_start)
+                while j < batch_stop and segments[j].start <= last:
+                    seg = segments[j]
+                    piece = slice_track(track, seg.start, seg.stop, offset=seg.start if rebase else 0)
+                    if piece is not None:
+                        writers[j].write(piece)
+                    j += 1
+    return out_paths
+
+
+def _window_boxes(tracks: List[Track], start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Dense (n_tracks, n_frames, 4) boxes and visibility mask for frames [start, stop]."""
+    width = stop - start + 1
+    boxes = np.zeros((len(tracks), width, 4), dtype=np.float64)
+    present = np.zeros((len(tracks), width), dtype=bool)
+    for i, track in enumerate(tracks):
+        window = slice_track(track, start, stop)
+        if window is None:
+            continue
+        for b in window.boxes:
+            if b.outside:
+                continue
+            boxes[i, b.frame - start] = (b.xtl, b.ytl, b.xbr, b.ybr)
+            present[i, b.frame - start] = True
+    return boxes, present
+
+
+def _match_overlap(prev: List[Track], cur: List[Track], start: int, stop: int, iou_threshold: float) -> List[Tuple[int, int]]:
+    """Pair tracks of consecutive segments by mean IoU over the overlap frames [start, stop]."""
+    if not prev or not cur or stop < start:
+        return []
+    prev_boxes, prev_present = _window_boxes(prev, start, stop)
+    cur_boxes, cur_present = _window_boxes(cur, start, stop)
+    iou_sum = np.zeros((len(prev), len(cur)), dtype=np.float64)
+    counts = np.zeros((len(prev), len(cur)), dtype=np.int64)
+    for w in range(stop - start + 1):
+        valid = prev_present[:, w, None] & cur_present[None, :, w]
+        iou_sum += np.where(valid, iou_matrix(prev_boxes[:, w], cur_boxes[:, w]), 0.0)
+        counts += valid
+    mean_iou = np.divide(iou_sum, counts, out=np.zeros_like(iou_sum), where=counts > 0)
+    same_label = np.array([[p.label == c.label for c in cur] for p in prev], dtype=bool)
+    mean_iou[~same_label] = 0.0
+
+    _, x, _ = lap.lapjv(1.0 - mean_iou, extend_cost=True, cost_limit=1.0 - iou_threshold + 1e-9)
+    return [(i, int(j)) for i, j in enumerate(x) if j >= 0 and mean_iou[i, j] >= iou_threshold]
+
+
+def concat_cvat_xml(
+    paths: List[str],
+    out_path: str,
+    segment_size: Optional[int] = None,
+    overlap: Optional[int] = None,
+    iou_threshold: float = 0.5,
+) -> int:
+    """Join per-segment CVAT XML files (in order) into one file with consistent track IDs.
+
+    Frames are taken as absolute unless ``segment_size`` is given, in which case file ``i`` is
+    treated as rebased and shifted by ``i * (segment_size - overlap)``. Tracks crossing a
+    segment boundary are linked by mean IoU over the overlap frames; all tracks get new IDs
+    starting from 0. Only tracks that reach into the next overlap are held in memory.
+    Returns the number of written tracks.
+    """
+    metas = [_load_meta(p) for p in paths]
+    if overlap is None:
+        overlap = metas[0].overlap
+    if segment_size is not None and not 0 <= overlap < segment_size:
+        raise ValueError("overlap must be in [0, segment_size)")
+    shifts = [i * (segment_size - overlap) if segment_size else 0 for i in range(len(paths))]
+    ranges = [Segment(id=i, start=m.start_frame + s, stop=m.stop_frame + s) for i, (m, s) in enumerate(zip(metas, shifts))]
+
+    if segment_size is None:
+        overlap = max((max(prev.stop - cur.start + 1, 0) for prev, cur in zip(ranges, ranges[1:])), default=metas[0].overlap)
+    start_frame = ranges[0].start
+    stop_frame = max(r.stop for r in ranges)
+    out_meta = replace(
+        metas[0],
+        size=stop_frame - start_frame + 1,
+        overlap=overlap,
+        start_frame=start_frame,
+        stop_frame=stop_frame,
+        updated=_get_current_timestamp(),
+        segments=ranges,
+        labels=list(dict.fromkeys(label for m in metas for label in m.labels)),
+    )
+
+    written = 0
+    next_id = 0
+    open_tracks: List[Track] = []
+
+    with CvatXmlWriter(out_path, out_meta) as writer:
+
+        def emit(track: Track, keep_from: Optional[int], pending: List[Track]) -> None:
+            nonlocal written
+            if keep_from is not None and track.boxes and track.boxes[-1].frame >= keep_from:
+                pending.append(track)
+            else:
+                writer.write(track)
+                written += 1
+
+        for i, path in enumerate(paths):
+            cur_start = ranges[i].start
+            prev_stop = ranges[i - 1].stop if i > 0 else cur_start - 1
+            next_start = ranges[i + 1].start if i + 1 < len(paths) else None
+            pending: List[Track] = []
+            candidates: List[Track] = []
+
+            for track in iter_cvat_tracks(path):
+                track = _shift_track(track, shifts[i])
+                if not track.boxes:
+                    continue
+                if open_tracks and track.boxes[0].frame <= prev_stop:
+                    candidates.append(track)
+                    continue
+                emit(Track(id=next_id, label=track.label, boxes=track.boxes, source=track.source), next_start, pending)
+                next_id += 1
+
+            matches = dict(_match_overlap(open_tracks, candidates, cur_start, prev_stop, iou_threshold))
+            matched_cur = set(matches.values())
+            for pi, prev in enumerate(open_tracks):
+                if pi not in matches:
+                    emit(prev, None, pending)
+                    continue
+                cur = candidates[matches[pi]]
+                # Earlier segment keeps priority on the frames it covers; it may end inside the overlap
+                tail: List[Box] = cur.boxes[bisect_right(cur.boxes, prev.boxes[-1].frame, key=attrgetter("frame")):]
+                emit(Track(id=prev.id, label=prev.label, boxes=prev.boxes + tail, source=prev.source), next_start, pending)
+            for ci, cur in enumerate(candidates):
+                if ci not in matched_cur:
+                    emit(Track(id=next_id, label=cur.label, boxes=cur.boxes, source=cur.source), next_start, pending)
+                    next_id += 1
+            open_tracks = pending
+
+        for track in open_tracks:
+            emit(track, None, [])
+    return written
@@ -0,0 +1,519 @@
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from .cvat_xml import read_cvat_xml, write_cvat_xml, merge_tracks_by_ids, delete_tracks_by_ids
+from .renderer import render_xml_on_video
+from .utils import parse_id_list
+
+ProgressFn = Callable[[int, int], None]
+
+# Job type -> (required params, optional params, params that must point to existing files)
+JOB_PARAMS: Dict[str, Tuple[Set[str], Set[str], Set[str]]] = {
+    "detect-track": ({"model", "video", "out_xml"}, {"save_video", "use_sahi"}, {"model", "video"}),
+    "render": ({"xml", "video", "out_video"}, set(), {"xml", "video"}),
+    "edit": ({"xml", "out_xml"}, {"merge", "delete", "video", "save_video"}, {"xml", "video"}),
+}
+
+PATH_PARAMS = {"model", "video", "xml", "out_xml", "out_video", "save_video"}
+
+DEFAULT_LIMITS: Dict[str, int] = {"detect-track": 1, "render": 2, "edit": 4}
+
+DEFAULT_MAX_FINISHED_JOBS = 1000
+
+TERMINAL_STATUSES = {"done", "failed"}
+
+_HTTP_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    415: "Unsupported Media Type",
+    500: "Internal Server Error",
+}
+
+_MAX_BODY = 1 << 20
+
+
+# --- Worker process side -------------------------------------------------
+
+_WORKER_MODELS: Dict[str, Any] = {}
+
+
+def _get_model(model_path: str) -> Any:
+    """Load a YOLO model once per worker process and keep it warm for later jobs."""
+    model = _WORKER_MODELS.get(model_path)
+    if model is None:
+        # Imported lazily so the event-loop process never loads torch
+        from ultralytics import YOLO
+
+        model = YOLO(model_path)
+        _WORKER_MODELS[model_path] = model
+    return model
+
+
+def _init_worker(preload_models: List[str]) -> None:
+    for model_path in preload_models:
+        _get_model(model_path)
+
+
+def _warm_up() -> int:
+    """No-op submitted once per worker at start so every worker (and its models) is loaded up front."""
+    return os.getpid()
+
+
+def _progress_reporter(job_id: str, queue: Any) -> ProgressFn:
+    """Forward frame progress to the server, at most once per percent."""
+    last = -1
+
+    def report(done: int, total: int) -> None:
+        nonlocal last
+        step = done * 100 // total if total else done // 100
+        if step != last or done == total:
+            last = step
+            queue.put((job_id, done, total))
+
+    return report
+
+
+def _id_list(value: Any) -> List[int]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return parse_id_list(value)
+    return [int(x) for x in value]
+
+
+def _detect_job(params: Dict[str, Any], progress: ProgressFn) -> Dict[str, Any]:
+    from .detector import detect_and_track_to_xml
+
+    tracks = detect_and_track_to_xml(
+        model_path=params["model"],
+        video_path=params["video"],
+        out_xml_path=params["out_xml"],
+        out_video_path=params.get("save_video"),
+        use_sahi=bool(params.get("use_sahi", False)),
+        model=_get_model(params["model"]),
+        progress=progress,
+    )
+    return {"out_xml": params["out_xml"], "save_video": params.get("save_video"), "tracks": len(tracks)}
+
+
+def _render_job(params: Dict[str, Any], progress: ProgressFn) -> Dict[str, Any]:
+    tracks = read_cvat_xml(params["xml"])
+    render_xml_on_video(tracks, params["video"], params["out_video"], progress=progress)
+    return {"out_video": params["out_video"], "tracks": len(tracks)}
+
+
+def _edit_job(params: Dict[str, Any], progress: ProgressFn) -> Dict[str, Any]:
+    tracks = read_cvat_xml(params["xml"])
+    merge_list = _id_list(params.get("merge"))
+    delete_list = _id_list(params.get("delete"))
+    if merge_list:
+        tracks = merge_tracks_by_ids(tracks, merge_list)
+    if delete_list:
+        tracks = delete_tracks_by_ids(tracks, set(delete_list))
+    write_cvat_xml(tracks, params["out_xml"])
+    if params.get("video") and params.get("save_video"):
+        render_xml_on_video(tracks, params["video"], params["save_video"], progress=progress)
+    return {"out_xml": params["out_xml"], "save_video": params.get("save_video"), "tracks": len(tracks)}
+
+
+_JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any], ProgressFn], Dict[str, Any]]] = {
+    "detect-track": _detect_job,
+    "render": _render_job,
+    "edit": _edit_job,
+}
+
+
+def _run_job(job_type: str, params: Dict[str, Any], job_id: str, progress_queue: Any) -> Dict[str, Any]:
+    return _JOB_HANDLERS[job_type](params, _progress_reporter(job_id, progress_queue))
+
+
+# --- Server side -----------------------------------------------------------
+
+
+@dataclass
+class Job:
+    id: str
+    type: str
+    params: Dict[str, Any]
+    status: str = "queued"
+    done: int = 0
+    total: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    subscribers: Set[asyncio.Queue] = field(default_factory=set, repr=False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "progress": {"done": self.done, "total": self.total},
+            "params": self.params,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobError(ValueError):
+    pass
+
+
+def validate_job(job_type: Any, params: Any) -> None:
+    if not isinstance(job_type, str) or job_type not in JOB_PARAMS:
+        raise JobError(f"Unknown job type {job_type!r}; expected one of {sorted(JOB_PARAMS)}")
+    if not isinstance(params, dict):
+        raise JobError("'params' must be an object")
+    required, optional, existing = JOB_PARAMS[job_type]
+    missing = required - params.keys()
+    if missing:
+        raise JobError(f"Missing params: {', '.join(sorted(missing))}")
+    unknown = params.keys() - required - optional
+    if unknown:
+        raise JobError(f"Unknown params: {', '.join(sorted(unknown))}")
+    for name in PATH_PARAMS & params.keys():
+        if params[name] is not None and not isinstance(params[name], str):
+            raise JobError(f"Param {name!r} must be a path string")
+    for name in existing & params.keys():
+        if params[name] and not os.path.isfile(params[name]):
+            raise JobError(f"File not found for {name!r}: {params[name]}")
+    for name in ("merge", "delete"):
+        value = params.get(name)
+        if value is not None and not isinstance(value, str) and not (
+            isinstance(value, list) and all(isinstance(x, int) and not isinstance(x, bool) for x in value)
+        ):
+            raise JobError(f"Param {name!r} must be a comma-separated string or a list of integers")
+
+
+def _host_header_name(value: str) -> str:
+    """Host part of a Host header value ("127.0.0.1:8765", "[::1]:8765", "localhost")."""
+    if value.startswith("["):
+        return value[1:value.find("]")]
+    return value.rsplit(":", 1)[0] if value.count(":") == 1 else value
+
+
+def is_loopback_host(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class JobServer:
+    """Local HTTP job server running detect-track/render/edit jobs in a warm process pool.
+
+    Endpoints (JSON):
+      GET  /health              server status
+      GET  /jobs                all jobs
+      POST /jobs                {"type": ..., "params": {...}} -> queued job
+      GET  /jobs/<id>           job status and result
+      GET  /jobs/<id>/events    newline-delimited job snapshots until the job finishes
+
+    Only the latest ``max_finished_jobs`` finished jobs are kept. If a worker process dies the
+    pool is rebuilt and warmed up again; jobs that were running on it are retried once.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        workers: int = 2,
+        limits: Optional[Dict[str, int]] = None,
+        preload_models: Optional[List[str]] = None,
+        max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS,
+    ) -> None:
+        if not is_loopback_host(host):
+            raise ValueError(f"Refusing to bind to non-loopback host {host!r}")
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.preload_models = list(preload_models or [])
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs: Dict[str, Job] = {}
+        self._finished: Deque[str] = deque()
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_status = "stopped"
+        self._pool_restarts = 0
+        self._pool_lock = asyncio.Lock()
+        self._ctx = multiprocessing.get_context("spawn")
+        self._manager = None
+        self._progress_queue = None
+        self._pump: Optional[threading.Thread] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._manager = self._ctx.Manager()
+        self._progress_queue = self._manager.Queue()
+        self._semaphores = {job_type: asyncio.Semaphore(limit) for job_type, limit in self.limits.items()}
+        self._pump = threading.Thread(target=self._pump_progress, args=(loop,), daemon=True)
+        self._pump.start()
+        await self._start_pool()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _start_pool(self) -> None:
+        # spawn: torch/CUDA state does not survive fork reliably
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=self._ctx, initializer=_init_worker, initargs=(self.preload_models,)
+        )
+        # Workers start lazily; submit one no-op each so processes and preloaded models are warm now
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _warm_up) for _ in range(self.workers)))
+        self._pool_status = "ok"
+
+    async def _restart_pool(self, broken: ProcessPoolExecutor) -> None:
+        """Replace a pool broken by a dead worker; callers that saw the same pool restart it once."""
+        async with self._pool_lock:
+            if self._pool is not broken:
+                return
+            self._pool_status = "restarting"
+            self._pool_restarts += 1
+            broken.shutdown(wait=False, cancel_futures=True)
+            try:
+                await self._start_pool()
+            except BrokenProcessPool:
+                self._pool_status = "broken"
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._progress_queue is not None:
+            self._progress_queue.put(None)
+        if self._pump is not None:
+            self._pump.join(timeout=5)
+        if self._manager is not None:
+            self._manager.shutdown()
+
+    # Jobs
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> Job:
+        validate_job(job_type, params)
+        job = Job(id=str(next(self._ids)), type=job_type, params=params)
+        self.jobs[job.id] = job
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._semaphores[job.type]:
+            job.status = "running"
+            job.started = time.time()
+            self._notify(job)
+            for attempt in range(2):
+                pool = self._pool
+                try:
+                    job.result = await loop.run_in_executor(pool, _run_job, job.type, job.params, job.id, self._progress_queue)
+                    job.status = "done"
+                except BrokenProcessPool as e:
+                    # A worker died (e.g. OOM-killed); rebuild the pool and retry the job once
+                    await self._restart_pool(pool)
+                    if attempt == 0:
+                        continue
+                    job.status = "failed"
+                    job.error = f"{type(e).__name__}: {e}"
+                except Exception as e:  # report any worker failure on the job
+                    job.status = "failed"
+                    job.error = f"{type(e).__name__}: {e}"
+                break
+            job.finished = time.time()
+            self._notify(job)
+            self._forget_finished(job)
+
+    def _forget_finished(self, job: Job) -> None:
+        """Drop the oldest finished jobs beyond ``max_finished_jobs``."""
+        self._finished.append(job.id)
+        while len(self._finished) > self.max_finished_jobs:
+            self.jobs.pop(self._finished.popleft(), None)
+
+    def _pump_progress(self, loop: asyncio.AbstractEventLoop) -> None:
+        while True:
+            try:
+                item = self._progress_queue.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            loop.call_soon_threadsafe(self._on_progress, *item)
+
+    def _on_progress(self, job_id: str, done: int, total: int) -> None:
+        job = self.jobs.get(job_id)
+        if job is None or job.status in TERMINAL_STATUSES:
+            return
+        job.done, job.total = done, total
+        self._notify(job)
+
+    def _notify(self, job: Job) -> None:
+        snapshot = job.snapshot()
+        for queue in job.subscribers:
+            queue.put_nowait(snapshot)
+
+    # HTTP
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            method, path, headers, body = await self._read_request(reader)
+            # Loopback binding alone does not stop browser pages (DNS rebinding, simple CORS requests)
+            if not is_loopback_host(_host_header_name(headers.get("host", ""))):
+                await self._send_json(writer, 403, {"error": "Host header must name a loopback address"})
+                return
+            await self._route(method, path, headers, body, writer)
+        except JobError as e:
+            await self._send_json(writer, 400, {"error": str(e)})
+        except (ValueError, asyncio.IncompleteReadError, UnicodeDecodeError):
+            await self._send_json(writer, 400, {"error": "Malformed request"})
+        except ConnectionError:
+            pass
+        except Exception as e:  # never drop the connection without a response
+            try:
+                await self._send_json(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        method, target, _ = request_line.split(" ", 2)
+        headers: Dict[str, str] = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0"))
+        if length > _MAX_BODY:
+            raise JobError("Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0].rstrip("/") or "/", headers, body
+
+    async def _route(self, method: str, path: str, headers: Dict[str, str], body: bytes, writer: asyncio.StreamWriter) -> None:
+        parts = [p for p in path.split("/") if p]
+        if parts == ["health"]:
+            if method != "GET":
+                return await self._send_json(writer, 405, {"error": "Method not allowed"})
+            counts = {s: sum(1 for j in self.jobs.values() if j.status == s) for s in ("queued", "running", "done", "failed")}
+            await self._send_json(
+                writer,
+                200,
+                {
+                    "status": "ok" if self._pool_status == "ok" else "degraded",
+                    "pool": {"status": self._pool_status, "restarts": self._pool_restarts},
+                    "workers": self.workers,
+                    "limits": self.limits,
+                    "jobs": counts,
+                },
+            )
+        elif parts == ["jobs"]:
+            if method == "GET":
+                await self._send_json(writer, 200, [job.snapshot() for job in self.jobs.values()])
+            elif method == "POST":
+                # Requiring JSON forces a CORS preflight for cross-origin browser requests
+                if headers.get("content-type", "").split(";", 1)[0].strip().lower() != "application/json":
+                    return await self._send_json(writer, 415, {"error": "Content-Type must be application/json"})
+                payload = json.loads(body or b"{}")
+                if not isinstance(payload, dict):
+                    raise JobError("Request body must be a JSON object")
+                job = self.submit(payload.get("type"), payload.get("params", {}))
+                await self._send_json(writer, 202, job.snapshot())
+            else:
+                await self._send_json(writer, 405, {"error": "Method not allowed"})
+        elif len(parts) in (2, 3) and parts[0] == "jobs" and parts[1] in self.jobs and parts[2:] in ([], ["events"]):
+            job = self.jobs[parts[1]]
+            if method != "GET":
+                await self._send_json(writer, 405, {"error": "Method not allowed"})
+            elif len(parts) == 2:
+                await self._send_json(writer, 200, job.snapshot())
+            else:
+                await self._stream_events(job, writer)
+        else:
+            await self._send_json(writer, 404, {"error": "Not found"})
+
+    async def _stream_events(self, job: Job, writer: asyncio.StreamWriter) -> None:
+        writer.write(self._headers(200, "application/x-ndjson"))
+        queue: asyncio.Queue = asyncio.Queue()
+        job.subscribers.add(queue)
+        try:
+            snapshot = job.snapshot()
+            while True:
+                writer.write(json.dumps(snapshot).encode() + b"\n")
+                await writer.drain()
+                if snapshot["status"] in TERMINAL_STATUSES:
+                    break
+                snapshot = await queue.get()
+        finally:
+            job.subscribers.discard(queue)
+
+    @staticmethod
+    def _headers(status: int, content_type: str, length: Optional[int] = None) -> bytes:
+        lines = [f"HTTP/1.1 {status} {_HTTP_REASONS.get(status, '')}", f"Content-Type: {content_type}", "Connection: close"]
+        if length is not None:
+            lines.append(f"Content-Length: {length}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode()
+        writer.write(self._headers(status, "application/json", len(body)) + body)
+        await writer.drain()
+
+
+async def serve(
+    host: str,
+    port: int,
+    workers: int,
+    limits: Dict[str, int],
+    preload_models: List[str],
+    on_ready: Optional[Callable[[JobServer], None]] = None,
+    max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS,
+) -> None:
+    server = JobServer(host=host, port=port, workers=workers, limits=limits, preload_models=preload_models, max_finished_jobs=max_finished_jobs)
+    await server.start()
+    if on_ready is not None:
+        on_ready(server)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
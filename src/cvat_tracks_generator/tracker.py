@@ -1,32 +1,62 @@
 from __future__ import annotations
 
-from typing import Dict
-from ultralytics import YOLO
+from typing import TYPE_CHECKING, Dict, List, Tuple
+import numpy as np
 
 from .cvat_xml import Track, Box
+from .video import VideoSource
 
+if TYPE_CHECKING:
+    # Only needed for annotations; the model object is passed in by the caller
+    from ultralytics import YOLO
 
-def run_bytetrack(model: YOLO, video_path: str) -> Dict[int, Track]:
-    """Run Ultralytics ByteTrack on a video and return tracks as dict[id]=Track."""
-    tracks: Dict[int, Track] = {}
-    frame_index = -1
-    for result in model.track(source=video_path, tracker="bytetrack.yaml", stream=True, verbose=False):
-        frame_index += 1
+
+class ByteTrackRunner:
+    """Frame consumer that runs Ultralytics ByteTrack incrementally and collects tracks.
+
+    ``last_boxes`` holds (track_id, xyxy) of the most recent frame for consumers that follow it.
+    """
+
+    def __init__(self, model: YOLO) -> None:
+        self.model = model
+        # A reused model keeps its trackers between videos when persist=True; start from a clean state
+        predictor = getattr(model, "predictor", None)
+        for tracker in getattr(predictor, "trackers", None) or []:
+            tracker.reset()
+        self.tracks: Dict[int, Track] = {}
+        self.last_boxes: List[Tuple[int, List[float]]] = []
+
+    def __call__(self, frame_index: int, frame: np.ndarray) -> None:
+        self.last_boxes = []
+        result = self.model.track(source=frame, tracker="bytetrack.yaml", persist=True, verbose=False)[0]
         if result.boxes is None:
-            continue
+            return
         boxes_xyxy = result.boxes.xyxy.cpu().numpy()
         ids = result.boxes.id.cpu().numpy() if result.boxes.id is not None else None
         clss = result.boxes.cls.cpu().numpy() if result.boxes.cls is not None else None
         if ids is None:
-            continue
+            return
         for i in range(boxes_xyxy.shape[0]):
             tid = int(ids[i])
             x1, y1, x2, y2 = boxes_xyxy[i].tolist()
             label = str(int(clss[i])) if clss is not None else "object"
-            if tid not in tracks:
-                tracks[tid] = Track(id=tid, label=label, boxes=[])
-            tracks[tid].boxes.append(Box(frame=frame_index, xtl=x1, ytl=y1, xbr=x2, ybr=y2, outside=0, occluded=0))
-    for t in tracks.values():
-        t.boxes.sort(key=lambda b: b.frame)
-    return tracks
+            if tid not in self.tracks:
+                self.tracks[tid] = Track(id=tid, label=label, boxes=[])
+            self.tracks[tid].boxes.append(Box(frame=frame_index, xtl=x1, ytl=y1, xbr=x2, ybr=y2, outside=0, occluded=0))
+            self.last_boxes.append((tid, [x1, y1, x2, y2]))
+
+    def result(self) -> Dict[int, Track]:
+        for t in self.tracks.values():
+            t.boxes.sort(key=lambda b: b.frame)
+        return self.tracks
 
+
+def run_bytetrack(model: YOLO, video: str | VideoSource) -> Dict[int, Track]:
+    """Run Ultralytics ByteTrack on a video and return tracks as dict[id]=Track."""
+    runner = ByteTrackRunner(model)
+    if isinstance(video, VideoSource):
+        video.fan_out([runner])
+    else:
+        with VideoSource(video) as source:
+            source.fan_out([runner])
+    return runner.result()
@@ -4,6 +4,8 @@ from pathlib import Path
 from typing import Tuple
 import cv2
 
+from .video import VideoSource
+
 
 def ensure_parent_dir(path: str) -> None:
     p = Path(path)
@@ -16,15 +18,8 @@ def parse_id_list(arg: str) -> list[int]:
 
 
 def video_meta(video_path: str) -> Tuple[int, int, float, int]:
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise RuntimeError("Failed to open input video")
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = float(cap.get(cv2.CAP_PROP_FPS) or 25.0)
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
-    cap.release()
-    return width, height, fps, frame_count
+    with VideoSource(video_path) as source:
+        return source.width, source.height, source.fps, source.frame_count
 
 
 def create_video_writer(out_path: str, width: int, height: int, fps: float) -> cv2.VideoWriter:
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+import cv2
+import numpy as np
+
+FrameConsumer = Callable[[int, np.ndarray], None]
+
+
+def _scan_keyframes(path: str) -> List[int]:
+    """Indices of keyframes, found by reading raw packets without decoding (FFmpeg backend only)."""
+    cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG)
+    keyframes: List[int] = []
+    try:
+        if not cap.isOpened() or not cap.set(cv2.CAP_PROP_FORMAT, -1):
+            return keyframes
+        index = 0
+        while cap.grab():
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(index)
+            index += 1
+    finally:
+        cap.release()
+    return keyframes
+
+
+class VideoSource:
+    """Single decoder over a video file.
+
+    Frames can be iterated sequentially, fanned out to several consumers in one decode pass,
+    or read by index. Random reads seek to the nearest keyframe (index built lazily from the
+    container packets) and decode forward, reusing the current position when it is closer.
+    With ``cache_size`` > 0 the most recently decoded frames are kept in an LRU cache;
+    ``scale`` < 1 downscales frames as they are decoded (and cached).
+    """
+
+    def __init__(self, path: str, cache_size: int = 0, scale: float = 1.0) -> None:
+        self.path = path
+        self.cache_size = cache_size
+        self.scale = scale
+        self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise RuntimeError("Failed to open input video")
+
+        src_width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        src_height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.width = max(1, round(src_width * scale)) if scale != 1.0 else src_width
+        self.height = max(1, round(src_height * scale)) if scale != 1.0 else src_height
+        self.fps = float(self._cap.get(cv2.CAP_PROP_FPS) or 25.0)
+        self.frame_count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+        self._pos = 0
+        self._keyframes: Optional[List[int]] = None
+        self._cache: OrderedDict[int, np.ndarray] = OrderedDict()
+
+    def __enter__(self) -> "VideoSource":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        return self.frames()
+
+    def release(self) -> None:
+        self._cap.release()
+        self._cache.clear()
+
+    @property
+    def keyframes(self) -> List[int]:
+        if self._keyframes is None:
+            self._keyframes = _scan_keyframes(self.path)
+        return self._keyframes
+
+    def _decode_next(self) -> Optional[np.ndarray]:
+        ok, frame = self._cap.read()
+        if not ok:
+            return None
+        index = self._pos
+        self._pos += 1
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        if self.cache_size > 0:
+            self._cache[index] = frame.copy()
+            self._cache.move_to_end(index)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return frame
+
+    def _seek(self, index: int) -> None:
+        if index == self._pos:
+            return
+        keyframes = self.keyframes
+        if not keyframes:
+            # No keyframe index available for this backend: let OpenCV seek
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self._pos = index
+            return
+        keyframe = keyframes[max(bisect_right(keyframes, index) - 1, 0)]
+        if not keyframe <= self._pos <= index:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self._pos = keyframe
+        while self._pos < index:
+            if not self._cap.grab():
+                break
+            self._pos += 1
+
+    def read(self, index: int) -> np.ndarray:
+        """Return frame ``index`` (a private copy when served from the cache)."""
+        cached = self._cache.get(index)
+        if cached is not None:
+            self._cache.move_to_end(index)
+            return cached.copy()
+        self._seek(index)
+        frame = self._decode_next() if self._pos == index else None
+        if frame is None:
+            raise IndexError(f"Frame {index} is out of range")
+        return frame
+
+    def frames(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """Decode frames [start, stop) sequentially, yielding (index, frame)."""
+        self._seek(start)
+        while stop is None or self._pos < stop:
+            index = self._pos
+            frame = self._decode_next()
+            if frame is None:
+                break
+            yield index, frame
+
+    def fan_out(self, consumers: Iterable[FrameConsumer], start: int = 0, stop: Optional[int] = None) -> int:
+        """Decode once and pass every frame to each consumer in order; returns the number of frames.
+
+        Consumers receive the same array, so one that draws on it should come last.
+        """
+        consumers = list(consumers)
+        count = 0
+        for index, frame in self.frames(start, stop):
+            for consumer in consumers:
+                consumer(index, frame)
+            count += 1
+        return count
@@ -0,0 +1,120 @@
+from cvat_tracks_generator.cvat_xml import Track, Box
+from cvat_tracks_generator.diff import diff_tracks, merge3_tracks
+import numpy as np
+
+
+def _make_track(tid: int, frames: list[int], box=(0, 0, 10, 10), label: str = "obj") -> Track:
+    return Track(id=tid, label=label, boxes=[Box(frame=f, xtl=box[0], ytl=box[1], xbr=box[2], ybr=box[3]) for f in frames])
+
+
+def _shift_frame(track: Track, frame: int, dx: float) -> Track:
+    boxes = [Box(frame=b.frame, xtl=b.xtl + dx, ytl=b.ytl, xbr=b.xbr + dx, ybr=b.ybr) if b.frame == frame else b for b in track.boxes]
+    return Track(id=track.id, label=track.label, boxes=boxes, source=track.source)
+
+
+def test_diff_identical():
+    tracks = {1: _make_track(1, [1, 2, 3])}
+    assert diff_tracks(tracks, {1: _make_track(1, [1, 2, 3])}).is_empty
+
+
+def test_diff_added_removed_tracks():
+    old = {1: _make_track(1, [1]), 2: _make_track(2, [1])}
+    new = {2: _make_track(2, [1]), 3: _make_track(3, [1])}
+    result = diff_tracks(old, new)
+    assert result.added == [3]
+    assert result.removed == [1]
+    assert result.modified == {}
+
+
+def test_diff_boxes_with_tolerance():
+    old = {1: _make_track(1, [1, 2, 3, 4])}
+    new_track = _make_track(1, [2, 3, 4, 5])
+    new_track = _shift_frame(new_track, 3, 0.2)
+    new_track = _shift_frame(new_track, 4, 5.0)
+    result = diff_tracks(old, {1: new_track}, tolerance=0.5)
+    change = result.modified[1]
+    assert change.added_frames == [5]
+    assert change.removed_frames == [1]
+    assert change.modified_frames == [4]
+    assert not change.label_changed
+
+
+def test_diff_label_change():
+    result = diff_tracks({1: _make_track(1, [1], label="car")}, {1: _make_track(1, [1], label="truck")})
+    assert result.modified[1].label_changed
+    assert result.modified[1].modified_frames == []
+
+
+def test_merge3_non_conflicting_changes():
+    base = {1: _make_track(1, [1, 2, 3]), 2: _make_track(2, [1, 2])}
+    ours = {1: _shift_frame(_make_track(1, [1, 2, 3]), 1, 10), 2: _make_track(2, [1, 2])}
+    theirs = {1: _shift_frame(_make_track(1, [1, 2, 3, 4]), 3, 20), 3: _make_track(3, [5])}
+    merged, conflicts = merge3_tracks(base, ours, theirs)
+
+    assert conflicts == []
+    assert sorted(merged) == [1, 3]
+    boxes = {b.frame: b for b in merged[1].boxes}
+    assert sorted(boxes) == [1, 2, 3, 4]
+    assert boxes[1].xtl == 10
+    assert boxes[2].xtl == 0
+    assert boxes[3].xtl == 20
+
+
+def test_merge3_conflict_keeps_ours():
+    base = {1: _make_track(1, [1, 2])}
+    ours = {1: _shift_frame(_make_track(1, [1, 2]), 2, 10)}
+    theirs = {1: _shift_frame(_make_track(1, [1, 2]), 2, 30)}
+    merged, conflicts = merge3_tracks(base, ours, theirs)
+
+    assert len(conflicts) == 1
+    assert conflicts[0].track_id == 1
+    assert conflicts[0].frames == [2]
+    assert {b.frame: b.xtl for b in merged[1].boxes}[2] == 10
+
+
+def test_merge3_delete_vs_modify_keeps_edit():
+    base = {1: _make_track(1, [1, 2])}
+    ours: dict[int, Track] = {}
+    theirs = {1: _shift_frame(_make_track(1, [1, 2]), 1, 5)}
+    merged, conflicts = merge3_tracks(base, ours, theirs)
+    assert 1 in merged
+    assert conflicts[0].track_id == 1
+
+
+def test_merge3_same_id_added_on_both_sides():
+    base: dict[int, Track] = {}
+    ours = {1: _make_track(1, [1])}
+    theirs = {1: _make_track(1, [1], box=(50, 50, 60, 60))}
+    merged, conflicts = merge3_tracks(base, ours, theirs)
+    assert len(conflicts) == 1
+    assert conflicts[0].track_id == 1
+    assert "ID 2" in conflicts[0].reason
+    assert sorted(merged) == [1, 2]
+    assert merged[2].boxes[0].xtl == 50
+
+
+class _CountingNumpy:
+    """Forward to numpy while counting attribute lookups (one per numpy call)."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __getattr__(self, name):
+        self.calls += 1
+        return getattr(np, name)
+
+
+def test_diff_numpy_calls_do_not_grow_with_track_count(monkeypatch):
+    import cvat_tracks_generator.diff as diff_module
+
+    def count_calls(num_tracks: int) -> int:
+        old = {t: _make_track(t, [1, 2, 3]) for t in range(num_tracks)}
+        new = {t: _shift_frame(_make_track(t, [2, 3, 4]), 3, 5.0) for t in range(num_tracks)}
+        counter = _CountingNumpy()
+        monkeypatch.setattr(diff_module, "np", counter)
+        result = diff_tracks(old, new)
+        assert len(result.modified) == num_tracks
+        assert result.modified[num_tracks - 1].modified_frames == [3]
+        return counter.calls
+
+    assert count_calls(10) == count_calls(1000)
@@ -0,0 +1,97 @@
+from cvat_tracks_generator.cvat_xml import Track, Box
+from cvat_tracks_generator.metrics import evaluate_tracks, iou_matrix
+import numpy as np
+
+
+def _make_track(tid: int, frames: list[int], box=(0, 0, 10, 10)) -> Track:
+    return Track(id=tid, label="obj", boxes=[Box(frame=f, xtl=box[0], ytl=box[1], xbr=box[2], ybr=box[3]) for f in frames])
+
+
+def test_iou_matrix_values():
+    a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=float)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [100, 100, 110, 110]], dtype=float)
+    iou = iou_matrix(a, b)
+    assert iou.shape == (2, 3)
+    assert iou[0, 0] == 1.0
+    assert abs(iou[0, 1] - 50 / 150) < 1e-9
+    assert iou[1].sum() == 0.0
+
+
+def test_perfect_prediction():
+    gt = {1: _make_track(1, list(range(10))), 2: _make_track(2, list(range(10)), box=(50, 50, 60, 60))}
+    pred = {7: _make_track(7, list(range(10))), 8: _make_track(8, list(range(10)), box=(50, 50, 60, 60))}
+    result = evaluate_tracks(gt, pred)
+    assert result.tp == 20
+    assert result.fp == 0 and result.fn == 0
+    assert result.id_switches == 0
+    assert result.mota == 1.0
+    assert result.idf1 == 1.0
+    assert result.track_stats[1].pred_ids == [7]
+    assert result.track_stats[2].pred_ids == [8]
+
+
+def test_id_switch_counted():
+    # GT track 1 is covered by pred 5 on frames 0..4 and pred 6 on frames 5..9
+    gt = {1: _make_track(1, list(range(10)))}
+    pred = {5: _make_track(5, list(range(5))), 6: _make_track(6, list(range(5, 10)))}
+    result = evaluate_tracks(gt, pred)
+    assert result.tp == 10
+    assert result.id_switches == 1
+    assert abs(result.mota - 0.9) < 1e-9
+    # Only one pred track can be associated with the GT identity
+    assert result.idtp == 5
+    assert abs(result.idf1 - 0.5) < 1e-9
+    assert result.track_stats[1].pred_ids == [5, 6]
+
+
+def test_misses_and_false_positives():
+    gt = {1: _make_track(1, list(range(10)))}
+    pred = {
+        1: _make_track(1, list(range(5))),
+        2: _make_track(2, list(range(3)), box=(200, 200, 210, 210)),
+    }
+    result = evaluate_tracks(gt, pred)
+    assert result.tp == 5
+    assert result.fn == 5
+    assert result.fp == 3
+    assert abs(result.mota - 0.2) < 1e-9
+    assert result.track_stats[1].coverage == 0.5
+
+
+def test_outside_boxes_ignored():
+    gt = {1: Track(id=1, label="obj", boxes=[Box(frame=0, xtl=0, ytl=0, xbr=10, ybr=10), Box(frame=1, xtl=0, ytl=0, xbr=10, ybr=10, outside=1)])}
+    pred = {1: _make_track(1, [0])}
+    result = evaluate_tracks(gt, pred)
+    assert result.num_gt == 1
+    assert result.fn == 0
+
+
+def test_empty_inputs():
+    result = evaluate_tracks({}, {})
+    assert result.num_frames == 0
+    assert result.mota == 0.0
+    assert result.idf1 == 0.0
+
+
+def test_existing_match_kept_over_better_duplicate():
+    # Pred 5 follows GT all the way (IoU ~0.67); pred 6 only appears at frame 5 with IoU 1.0
+    gt = {1: _make_track(1, list(range(10)), box=(0, 0, 10, 10))}
+    pred = {
+        5: _make_track(5, list(range(10)), box=(0, 0, 10, 15)),
+        6: _make_track(6, [5], box=(0, 0, 10, 10)),
+    }
+    result = evaluate_tracks(gt, pred)
+    assert result.id_switches == 0
+    assert result.fp == 1
+    assert abs(result.mota - 0.9) < 1e-9
+    assert result.track_stats[1].pred_ids == [5]
+
+
+def test_pred_shared_by_two_gt_tracks_counted_once():
+    # Pred 9 follows GT 1 at frame 0, GT 2 at frame 1, and overlaps both at frame 2
+    gt = {1: _make_track(1, [0, 2]), 2: _make_track(2, [1, 2])}
+    pred = {9: _make_track(9, [0, 1, 2])}
+    result = evaluate_tracks(gt, pred)
+    assert result.tp == 3
+    assert result.fp >= 0
+    assert result.mota <= 1.0
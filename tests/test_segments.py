@@ -0,0 +1,130 @@
+from cvat_tracks_generator.cvat_xml import Track, Box, TaskMeta, read_cvat_xml, read_task_meta, write_cvat_xml
+from cvat_tracks_generator.segments import segment_ranges, slice_track, split_cvat_xml, concat_cvat_xml
+import os
+import pytest
+import resource
+
+
+def _make_track(tid: int, frames: list[int], box=(0, 0, 10, 10)) -> Track:
+    return Track(id=tid, label="obj", boxes=[Box(frame=f, xtl=box[0], ytl=box[1], xbr=box[2], ybr=box[3]) for f in frames])
+
+
+def test_segment_ranges_with_overlap():
+    segments = segment_ranges(0, 24, segment_size=10, overlap=2)
+    assert [(s.start, s.stop) for s in segments] == [(0, 9), (8, 17), (16, 24)]
+    assert [s.id for s in segments] == [0, 1, 2]
+
+
+def test_segment_ranges_single():
+    segments = segment_ranges(0, 5, segment_size=10, overlap=5)
+    assert [(s.start, s.stop) for s in segments] == [(0, 5)]
+
+
+def test_slice_track_with_offset():
+    track = _make_track(1, [1, 3, 5, 7, 9])
+    piece = slice_track(track, 3, 7, offset=3)
+    assert [b.frame for b in piece.boxes] == [0, 2, 4]
+    assert slice_track(track, 10, 20) is None
+
+
+def test_meta_segments_roundtrip(tmp_path):
+    path = str(tmp_path / "a.xml")
+    meta = TaskMeta(start_frame=0, stop_frame=20, size=21, overlap=3, labels=["obj"])
+    meta.segments = segment_ranges(0, 20, segment_size=12, overlap=3)
+    write_cvat_xml({1: _make_track(1, [0, 1])}, path, task_meta=meta)
+    read_meta = read_task_meta(path)
+    assert read_meta.overlap == 3
+    assert [(s.start, s.stop) for s in read_meta.segments] == [(0, 11), (9, 20)]
+    assert read_meta.labels == ["obj"]
+
+
+def test_split_then_concat_restores_tracks(tmp_path):
+    src = str(tmp_path / "tracks.xml")
+    tracks = {
+        5: _make_track(5, list(range(0, 25))),
+        9: _make_track(9, list(range(3, 7)), box=(100, 100, 120, 120)),
+        12: _make_track(12, list(range(15, 25)), box=(200, 200, 220, 220)),
+    }
+    write_cvat_xml(tracks, src, task_meta=TaskMeta(start_frame=0, stop_frame=24, size=25, overlap=2))
+
+    out_paths = split_cvat_xml(src, str(tmp_path / "parts"), segment_size=10)
+    assert len(out_paths) == 3
+    first = read_cvat_xml(out_paths[0])
+    assert sorted(first) == [5, 9]
+    assert [b.frame for b in first[5].boxes] == list(range(0, 10))
+    assert read_task_meta(out_paths[1]).segments[0].start == 8
+
+    joined = str(tmp_path / "joined.xml")
+    assert concat_cvat_xml(out_paths, joined) == 3
+    result = read_cvat_xml(joined)
+    frames = sorted(tuple(b.frame for b in t.boxes) for t in result.values())
+    assert frames == sorted(tuple(b.frame for b in t.boxes) for t in tracks.values())
+    meta = read_task_meta(joined)
+    assert (meta.start_frame, meta.stop_frame, meta.overlap) == (0, 24, 2)
+    assert [(s.start, s.stop) for s in meta.segments] == [(0, 9), (8, 17), (16, 24)]
+
+
+def test_split_rebased_and_concat_with_segment_size(tmp_path):
+    src = str(tmp_path / "tracks.xml")
+    write_cvat_xml({1: _make_track(1, list(range(0, 18)))}, src, task_meta=TaskMeta(start_frame=0, stop_frame=17, size=18, overlap=4))
+
+    out_paths = split_cvat_xml(src, str(tmp_path / "parts"), segment_size=10, rebase=True)
+    second = read_cvat_xml(out_paths[1])
+    assert [b.frame for b in second[1].boxes] == list(range(0, 10))
+
+    joined = str(tmp_path / "joined.xml")
+    concat_cvat_xml(out_paths, joined, segment_size=10, overlap=4)
+    result = read_cvat_xml(joined)
+    assert list(result) == [0]
+    assert [b.frame for b in result[0].boxes] == list(range(0, 18))
+
+
+def test_concat_does_not_link_distinct_objects(tmp_path):
+    a, b = str(tmp_path / "a.xml"), str(tmp_path / "b.xml")
+    write_cvat_xml({1: _make_track(1, list(range(0, 10)))}, a, task_meta=TaskMeta(start_frame=0, stop_frame=9, labels=["obj"]))
+    write_cvat_xml({1: _make_track(1, list(range(8, 15)), box=(500, 500, 510, 510))}, b, task_meta=TaskMeta(start_frame=8, stop_frame=14, labels=["obj"]))
+    joined = str(tmp_path / "joined.xml")
+    assert concat_cvat_xml([a, b], joined) == 2
+    assert os.path.exists(joined)
+    assert sorted(read_cvat_xml(joined)) == [0, 1]
+
+
+def test_concat_keeps_later_boxes_when_earlier_track_ends_in_overlap(tmp_path):
+    a, b = str(tmp_path / "a.xml"), str(tmp_path / "b.xml")
+    write_cvat_xml({1: _make_track(1, list(range(0, 9)))}, a, task_meta=TaskMeta(start_frame=0, stop_frame=9, labels=["obj"]))
+    write_cvat_xml({1: _make_track(1, list(range(8, 18)))}, b, task_meta=TaskMeta(start_frame=8, stop_frame=17, labels=["obj"]))
+    joined = str(tmp_path / "joined.xml")
+    assert concat_cvat_xml([a, b], joined) == 1
+    assert [b.frame for b in read_cvat_xml(joined)[0].boxes] == list(range(0, 18))
+
+
+def test_split_many_segments_with_few_open_files(tmp_path):
+    src = str(tmp_path / "tracks.xml")
+    write_cvat_xml({1: _make_track(1, list(range(0, 3000, 7)))}, src, task_meta=TaskMeta(start_frame=0, stop_frame=2999, overlap=0, labels=["obj"]))
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(256, hard), hard))
+    try:
+        out_paths = split_cvat_xml(src, str(tmp_path / "parts"), segment_size=10)
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    assert len(out_paths) == 300
+    assert all(os.path.exists(p) for p in out_paths)
+    assert [b.frame for b in read_cvat_xml(out_paths[1])[1].boxes] == [14]
+
+
+def test_split_caps_meta_overlap_for_small_segments(tmp_path):
+    src = str(tmp_path / "tracks.xml")
+    write_cvat_xml({1: _make_track(1, list(range(0, 10)))}, src)
+    assert read_task_meta(src).overlap == 5
+    out_paths = split_cvat_xml(src, str(tmp_path / "parts"), segment_size=4)
+    assert [(m.start_frame, m.stop_frame, m.overlap) for m in map(read_task_meta, out_paths)] == [(0, 3, 3), (1, 4, 3), (2, 5, 3), (3, 6, 3), (4, 7, 3), (5, 8, 3), (6, 9, 3)]
+    with pytest.raises(ValueError):
+        split_cvat_xml(src, str(tmp_path / "parts"), segment_size=4, overlap=4)
+
+
+def test_concat_rejects_overlap_not_below_segment_size(tmp_path):
+    a = str(tmp_path / "a.xml")
+    write_cvat_xml({1: _make_track(1, [0, 1])}, a)
+    with pytest.raises(ValueError):
+        concat_cvat_xml([a, a], str(tmp_path / "joined.xml"), segment_size=3, overlap=5)
+    assert not os.path.exists(tmp_path / "joined.xml")
@@ -0,0 +1,201 @@
+from cvat_tracks_generator.cvat_xml import Track, Box, read_cvat_xml, write_cvat_xml
+from cvat_tracks_generator.server import JobServer, JobError, validate_job, is_loopback_host
+import asyncio
+import json
+import pytest
+
+
+def _make_track(tid: int, frames: list[int]) -> Track:
+    return Track(id=tid, label="obj", boxes=[Box(frame=f, xtl=0, ytl=0, xbr=10, ybr=10) for f in frames])
+
+
+async def _request(port: int, method: str, path: str, payload=None, host: str = "localhost", content_type: str = "application/json") -> tuple[int, bytes]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    headers = f"Host: {host}:{port}\r\nContent-Length: {len(body)}\r\n"
+    if payload is not None:
+        headers += f"Content-Type: {content_type}\r\n"
+    writer.write(f"{method} {path} HTTP/1.1\r\n{headers}\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), content
+
+
+def test_loopback_only():
+    assert is_loopback_host("127.0.0.1")
+    assert is_loopback_host("localhost")
+    assert is_loopback_host("::1")
+    assert not is_loopback_host("0.0.0.0")
+    with pytest.raises(ValueError):
+        JobServer(host="0.0.0.0")
+
+
+def test_validate_job(tmp_path):
+    xml = str(tmp_path / "a.xml")
+    write_cvat_xml({1: _make_track(1, [0])}, xml)
+    validate_job("edit", {"xml": xml, "out_xml": "out.xml", "delete": "1"})
+    with pytest.raises(JobError):
+        validate_job("unknown", {})
+    with pytest.raises(JobError):
+        validate_job("edit", {"xml": xml})
+    with pytest.raises(JobError):
+        validate_job("edit", {"xml": xml, "out_xml": "out.xml", "bogus": 1})
+    with pytest.raises(JobError):
+        validate_job("render", {"xml": str(tmp_path / "missing.xml"), "video": xml, "out_video": "o.mp4"})
+    with pytest.raises(JobError):
+        validate_job(["edit"], {})
+    with pytest.raises(JobError):
+        validate_job("edit", {"xml": [xml], "out_xml": "out.xml"})
+    with pytest.raises(JobError):
+        validate_job("edit", {"xml": xml, "out_xml": {"a": 1}})
+    with pytest.raises(JobError):
+        validate_job("edit", {"xml": xml, "out_xml": "out.xml", "merge": {"a": 1}})
+
+
+def test_edit_job_over_http(tmp_path):
+    xml = str(tmp_path / "a.xml")
+    out_xml = str(tmp_path / "b.xml")
+    write_cvat_xml({1: _make_track(1, [0, 1]), 2: _make_track(2, [4, 5]), 3: _make_track(3, [7])}, xml)
+
+    async def scenario():
+        server = JobServer(port=0, workers=1)
+        await server.start()
+        try:
+            status, content = await _request(server.port, "GET", "/health")
+            assert status == 200 and json.loads(content)["status"] == "ok"
+
+            status, content = await _request(server.port, "POST", "/jobs", {"type": "edit", "params": {"xml": xml, "out_xml": out_xml, "merge": "1,2", "delete": [3]}})
+            assert status == 202
+            job_id = json.loads(content)["id"]
+
+            status, content = await _request(server.port, "GET", f"/jobs/{job_id}/events")
+            assert status == 200
+            events = [json.loads(line) for line in content.splitlines()]
+            assert events[-1]["status"] == "done"
+            assert events[-1]["result"]["tracks"] == 1
+
+            status, content = await _request(server.port, "GET", f"/jobs/{job_id}")
+            assert json.loads(content)["status"] == "done"
+
+            status, content = await _request(server.port, "POST", "/jobs", {"type": "edit", "params": {}})
+            assert status == 400
+            status, _ = await _request(server.port, "GET", "/jobs/999")
+            assert status == 404
+            status, _ = await _request(server.port, "DELETE", "/jobs")
+            assert status == 405
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+    merged = read_cvat_xml(out_xml)
+    assert list(merged) == [1]
+    assert [b.frame for b in merged[1].boxes] == [0, 1, 2, 3, 4, 5]
+
+
+def test_rejects_browser_style_requests(tmp_path):
+    xml = str(tmp_path / "a.xml")
+    write_cvat_xml({1: _make_track(1, [0])}, xml)
+    job = {"type": "edit", "params": {"xml": xml, "out_xml": str(tmp_path / "b.xml")}}
+
+    async def scenario():
+        server = JobServer(port=0, workers=1)
+        await server.start()
+        try:
+            status, _ = await _request(server.port, "POST", "/jobs", job, content_type="text/plain")
+            assert status == 415
+            status, _ = await _request(server.port, "POST", "/jobs", job, host="evil.example.com")
+            assert status == 403
+            status, _ = await _request(server.port, "GET", "/health", host="[::1]")
+            assert status == 200
+            status, content = await _request(server.port, "POST", "/jobs", {"type": ["x"]})
+            assert status == 400 and "Unknown job type" in json.loads(content)["error"]
+            status, _ = await _request(server.port, "POST", "/jobs", {"type": "edit", "params": {"xml": ["a"], "out_xml": "b"}})
+            assert status == 400
+            assert server.jobs == {}
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_workers_started_on_start():
+    async def scenario():
+        server = JobServer(port=0, workers=2)
+        await server.start()
+        try:
+            assert len(server._pool._processes) == 2
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_unexpected_error_returns_500():
+    async def scenario():
+        server = JobServer(port=0, workers=1)
+        await server.start()
+
+        def broken_submit(job_type, params):
+            raise TypeError("boom")
+
+        server.submit = broken_submit
+        try:
+            status, content = await _request(server.port, "POST", "/jobs", {"type": "edit", "params": {}})
+            assert status == 500
+            assert "boom" in json.loads(content)["error"]
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_pool_rebuilt_after_worker_dies(tmp_path):
+    xml = str(tmp_path / "a.xml")
+    write_cvat_xml({1: _make_track(1, [0])}, xml)
+    job = {"type": "edit", "params": {"xml": xml, "out_xml": str(tmp_path / "b.xml")}}
+
+    async def scenario():
+        server = JobServer(port=0, workers=1)
+        await server.start()
+        try:
+            (worker,) = server._pool._processes.values()
+            worker.kill()
+            worker.join(5)
+
+            status, content = await _request(server.port, "POST", "/jobs", job)
+            assert status == 202
+            status, content = await _request(server.port, "GET", f"/jobs/{json.loads(content)['id']}/events")
+            assert json.loads(content.splitlines()[-1])["status"] == "done"
+
+            status, content = await _request(server.port, "GET", "/health")
+            health = json.loads(content)
+            assert health["status"] == "ok"
+            assert health["pool"] == {"status": "ok", "restarts": 1}
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_finished_jobs_are_evicted(tmp_path):
+    xml = str(tmp_path / "a.xml")
+    write_cvat_xml({1: _make_track(1, [0])}, xml)
+
+    async def scenario():
+        server = JobServer(port=0, workers=1, max_finished_jobs=2)
+        await server.start()
+        try:
+            for i in range(4):
+                job = server.submit("edit", {"xml": xml, "out_xml": str(tmp_path / f"out{i}.xml")})
+                await asyncio.gather(*server._tasks)
+            assert list(server.jobs) == ["3", "4"]
+            status, _ = await _request(server.port, "GET", "/jobs/1")
+            assert status == 404
+            status, content = await _request(server.port, "GET", f"/jobs/{job.id}")
+            assert json.loads(content)["status"] == "done"
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,101 @@
+from cvat_tracks_generator.tracker import ByteTrackRunner, run_bytetrack
+from cvat_tracks_generator.video import VideoSource
+from pathlib import Path
+import numpy as np
+
+EXAMPLE_VIDEO = str(Path(__file__).parent.parent / "data" / "example.mp4")
+
+
+class _Tensor:
+    def __init__(self, values):
+        self._values = np.asarray(values, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._values
+
+
+class _Boxes:
+    def __init__(self, xyxy, ids, cls):
+        self.xyxy = _Tensor(xyxy)
+        self.id = _Tensor(ids) if ids is not None else None
+        self.cls = _Tensor(cls)
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class _Tracker:
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+
+class _Predictor:
+    def __init__(self):
+        self.trackers = [_Tracker()]
+
+
+class _FakeModel:
+    """Stands in for ultralytics.YOLO: returns scripted per-frame results and records calls."""
+
+    def __init__(self, script):
+        self.script = script
+        self.calls = []
+        self.predictor = None
+
+    def track(self, source, tracker, persist, verbose):
+        self.calls.append({"shape": source.shape, "tracker": tracker, "persist": persist})
+        return [self.script[len(self.calls) - 1]]
+
+
+def test_runner_indexes_frames_and_exposes_last_boxes():
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+    model = _FakeModel([
+        _Result(_Boxes([[0, 0, 10, 10], [20, 20, 30, 30]], [1, 2], [0, 3])),
+        _Result(_Boxes([[1, 1, 11, 11]], None, [0])),
+        _Result(None),
+        _Result(_Boxes([[2, 2, 12, 12]], [1], [0])),
+    ])
+    runner = ByteTrackRunner(model)
+
+    runner(0, frame)
+    assert runner.last_boxes == [(1, [0, 0, 10, 10]), (2, [20, 20, 30, 30])]
+    runner(1, frame)
+    assert runner.last_boxes == []
+    runner(2, frame)
+    assert runner.last_boxes == []
+    runner(3, frame)
+    assert runner.last_boxes == [(1, [2, 2, 12, 12])]
+
+    tracks = runner.result()
+    assert [b.frame for b in tracks[1].boxes] == [0, 3]
+    assert [b.frame for b in tracks[2].boxes] == [0]
+    assert tracks[2].label == "3"
+    assert all(call["persist"] and call["tracker"] == "bytetrack.yaml" for call in model.calls)
+
+
+def test_runner_resets_trackers_of_reused_model():
+    model = _FakeModel([])
+    ByteTrackRunner(model)
+    model.predictor = _Predictor()
+    ByteTrackRunner(model)
+    ByteTrackRunner(model)
+    assert model.predictor.trackers[0].resets == 2
+
+
+def test_run_bytetrack_feeds_every_decoded_frame():
+    with VideoSource(EXAMPLE_VIDEO) as source:
+        frame_count = source.frame_count
+        width, height = source.width, source.height
+    model = _FakeModel([_Result(_Boxes([[0, 0, 5, 5]], [7], [1]))] * frame_count)
+    tracks = run_bytetrack(model, EXAMPLE_VIDEO)
+    assert len(model.calls) == frame_count
+    assert model.calls[0]["shape"] == (height, width, 3)
+    assert [b.frame for b in tracks[7].boxes] == list(range(frame_count))
@@ -0,0 +1,94 @@
+from cvat_tracks_generator.cvat_xml import Track, Box
+from cvat_tracks_generator.renderer import render_xml_on_video
+from cvat_tracks_generator.utils import video_meta
+from cvat_tracks_generator.video import VideoSource
+from pathlib import Path
+import numpy as np
+import pytest
+
+EXAMPLE_VIDEO = str(Path(__file__).parent.parent / "data" / "example.mp4")
+
+
+def test_video_meta_matches_source():
+    width, height, fps, frame_count = video_meta(EXAMPLE_VIDEO)
+    with VideoSource(EXAMPLE_VIDEO) as source:
+        assert (width, height, fps, frame_count) == (source.width, source.height, source.fps, source.frame_count)
+    assert width > 0 and height > 0 and frame_count > 0
+
+
+def test_open_missing_video_raises():
+    with pytest.raises(RuntimeError):
+        VideoSource("does-not-exist.mp4")
+
+
+def test_random_read_matches_sequential_decode():
+    wanted = {3, 40, 130, 135}
+    with VideoSource(EXAMPLE_VIDEO) as source:
+        expected = {i: frame.copy() for i, frame in source.frames(stop=136) if i in wanted}
+    with VideoSource(EXAMPLE_VIDEO) as source:
+        assert source.keyframes[0] == 0
+        for index in (130, 3, 135, 40):
+            assert np.array_equal(source.read(index), expected[index])
+
+
+def test_read_out_of_range():
+    with VideoSource(EXAMPLE_VIDEO) as source:
+        with pytest.raises(IndexError):
+            source.read(source.frame_count + 10)
+
+
+def test_cache_serves_copies():
+    with VideoSource(EXAMPLE_VIDEO, cache_size=2) as source:
+        first = source.read(0)
+        first[:] = 0
+        again = source.read(0)
+        assert again.any()
+        source.read(1)
+        source.read(2)
+        assert list(source._cache) == [1, 2]
+
+
+def test_downscaled_frames():
+    with VideoSource(EXAMPLE_VIDEO, scale=0.5) as source:
+        frame = source.read(0)
+        assert frame.shape[:2] == (source.height, source.width)
+
+
+def test_fan_out_decodes_once_for_all_consumers():
+    seen_a: list[int] = []
+    seen_b: list[int] = []
+    with VideoSource(EXAMPLE_VIDEO) as source:
+        count = source.fan_out([lambda i, f: seen_a.append(i), lambda i, f: seen_b.append(i)], stop=10)
+    assert count == 10
+    assert seen_a == seen_b == list(range(10))
+
+
+def test_render_accepts_shared_source(tmp_path):
+    tracks = {1: Track(id=1, label="obj", boxes=[Box(frame=f, xtl=10, ytl=10, xbr=50, ybr=50) for f in range(5)])}
+    out = str(tmp_path / "out.mp4")
+    with VideoSource(EXAMPLE_VIDEO) as source:
+        render_xml_on_video(tracks, source, out)
+        assert source.read(0) is not None
+    assert video_meta(out)[3] == video_meta(EXAMPLE_VIDEO)[3]
+
+
+def test_render_rejects_downscaled_source(tmp_path):
+    with VideoSource(EXAMPLE_VIDEO, scale=0.5) as source:
+        with pytest.raises(ValueError):
+            render_xml_on_video({}, source, str(tmp_path / "out.mp4"))
+
+
+def test_render_releases_source_when_writer_fails(tmp_path, monkeypatch):
+    import cvat_tracks_generator.renderer as renderer
+
+    released = []
+    original_release = VideoSource.release
+    monkeypatch.setattr(VideoSource, "release", lambda self: (released.append(True), original_release(self)))
+
+    def failing_writer(*args, **kwargs):
+        raise RuntimeError("Failed to open output video writer")
+
+    monkeypatch.setattr(renderer, "create_video_writer", failing_writer)
+    with pytest.raises(RuntimeError):
+        render_xml_on_video({}, EXAMPLE_VIDEO, str(tmp_path / "out.mp4"))
+    assert released